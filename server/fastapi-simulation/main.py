@@ -1,16 +1,22 @@
 # main.py (or wherever)
 
+import time
+BOOT_STARTED = time.perf_counter()
+
 from pathlib import Path
-from asgiref.sync import sync_to_async
 import numpy as np
 from typing import List, Optional
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from django.conf import settings
 import django
 import os
 import sys
 
+IMPORTS_DONE = time.perf_counter()
+
 project_root = str(Path(__file__).parent.parent)
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
@@ -27,18 +33,39 @@ except Exception as e:
     print(f"Files in project root: {os.listdir(project_root)}")
     sys.exit(1)
 
+DJANGO_READY = time.perf_counter()
 
 try:
-    from orbits.models import BodyModel
+    from django.db import transaction
+    from orbits.models import BodyModel, Scenario, lineage_of, namespace_filter, resolve_bodies
+    from orbits.scenarios import fork_scenario, get_scenario, own_bodies, scenario_bodies, scenario_write_lock
     from orbits.simulation import (
         nbody_simulation_verlet, 
-        apply_maneuver, 
         TIME_STEP, 
         STEPS_PER_QUARTER, 
+        QUARTERS_TO_SIMULATE,
         SNAPSHOT_INTERVAL, 
-        simulate_quarters
+        simulate_quarters,
+        simulate_quarters_parareal,
+        get_state_at_time,
+        G
     )
-    from orbits.utils import date_to_seconds, seconds_to_date, get_trajectory_between_dates
+    from orbits.utils import date_to_seconds, seconds_to_date, interpolate_states, slice_trajectory
+    from orbits.ephemeris import trajectory_arrays, load_snapshot, snapshot_info, publish_if_configured, mapped_window
+    from orbits.trajectory_cache import trajectory_cache
+    from orbits.conjunctions import find_close_approaches_between_bodies
+    from orbits.porkchop import porkchop_grid
+    from orbits.targeting import solve_burn, propagate_test_particles, TARGETING_TIME_STEP
+    from orbits.kepler import epoch_state, fill_outside_coverage, kepler_error_bound, kepler_error_scale, preview_positions
+    from orbits.twobody import state_to_elements
+    from orbits.executors import compute_admission, db_reader, run_compute, run_db, run_write
+    from orbits.responses import body_versions, cached_json_response, is_not_modified, make_etag, MINIMUM_COMPRESS_SIZE
+    from orbits.codec import encode_trajectory
+    from orbits.scheduler import ManeuverScheduler, ManeuverSuperseded
+    from orbits.snapshots import policy_from_spec
+    from orbits.parareal import PARAREAL_TOLERANCE_KM
+    from orbits.tables import stream_export, TRAJECTORY_COLUMNS
+    from orbits.patched_conics import Attractor, patched_conic_preview
 except ImportError as e:
     print(f"Error importing Django models: {e}")
     print(f"Current Python path: {sys.path}")
@@ -47,18 +74,89 @@ except ImportError as e:
     print(f"Files in project root: {os.listdir(project_root)}")
     sys.exit(1)
 
+ORBITS_IMPORTED = time.perf_counter()
+
+class SelectiveGZipMiddleware(GZipMiddleware):
+    """GZip, except for routes whose binary bodies are already compact."""
+
+    def __init__(self, app, excluded_prefixes: tuple = (), **kwargs):
+        super().__init__(app, **kwargs)
+        self.excluded_prefixes = excluded_prefixes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].startswith(self.excluded_prefixes):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
 app = FastAPI(title="Orbital Simulation API")
+# Compresses every other JSON response; trajectory endpoints send
+# pre-compressed cached bytes, which the middleware passes through.
+# Codec blobs are quantized and delta-packed, so gzip would only add latency.
+app.add_middleware(
+    SelectiveGZipMiddleware,
+    minimum_size=MINIMUM_COMPRESS_SIZE,
+    excluded_prefixes=("/trajectory_encoded/",)
+)
+
+# Modules that must stay off the boot path; they are imported only by the
+# code that needs them.
+HEAVY_MODULES = ("astropy", "poliastro", "scipy", "pandas", "pyarrow")
+
+startup_report = {
+    "imports_seconds": IMPORTS_DONE - BOOT_STARTED,
+    "django_setup_seconds": DJANGO_READY - IMPORTS_DONE,
+    "orbits_imports_seconds": ORBITS_IMPORTED - DJANGO_READY,
+    "snapshot_load_seconds": None,
+    "snapshot": None,
+    "ready_seconds": None,
+    "first_request_seconds": None,
+    "heavy_modules_loaded": [],
+}
+
+@app.on_event("startup")
+async def load_ephemeris_snapshot():
+    # Store directory published by `python manage.py export_ephemeris <path>`
+    # and republished by every simulation run in any worker.
+    snapshot_path = os.getenv("EPHEMERIS_SNAPSHOT")
+    if snapshot_path:
+        started = time.perf_counter()
+        try:
+            load_snapshot(snapshot_path)
+            startup_report["snapshot"] = snapshot_info()
+        except (OSError, ValueError) as e:
+            print(f"Could not load ephemeris snapshot {snapshot_path}: {e}")
+        startup_report["snapshot_load_seconds"] = time.perf_counter() - started
+
+    startup_report["ready_seconds"] = time.perf_counter() - BOOT_STARTED
+    startup_report["heavy_modules_loaded"] = [name for name in HEAVY_MODULES if name in sys.modules]
+    print(f"Startup report: {startup_report}")
+
+@app.middleware("http")
+async def record_first_request(request, call_next):
+    response = await call_next(request)
+    if startup_report["first_request_seconds"] is None:
+        startup_report["first_request_seconds"] = time.perf_counter() - BOOT_STARTED
+    return response
 
 class NBodyInput(BaseModel):
     name: str
     mass: float
     position: List[float] = Field(..., min_items=3, max_items=3)
     velocity: List[float] = Field(..., min_items=3, max_items=3)
+    snapshot_policy: Optional[dict] = Field(None, description="How to sample this body's trajectory (see orbits.snapshots); kept if omitted")
 
 class ManeuverInput(BaseModel):
     body_name: str
     delta_velocity: List[float] = Field(..., min_items=3, max_items=3)
     simulation_time: Optional[float] = None  # Time at which to apply the maneuver
+    scenario: Optional[str] = None  # Scenario to apply it in (default namespace if omitted)
+
+class ScenarioInput(BaseModel):
+    name: str
+    parent: Optional[str] = Field(None, description="Scenario to fork from (default namespace if omitted)")
+    fork: bool = Field(True, description="Inherit the parent's bodies copy-on-write; False starts empty")
 
 class TrajectoryDateRangeInput(BaseModel):
     body_name: str
@@ -74,11 +172,46 @@ class TrajectoryRangeRequest(BaseModel):
     start_date: str = Field(..., description="Start date in YYYY-MM-DD format")
     end_date: str = Field(..., description="End date in YYYY-MM-DD format")
     body_names: List[str] = Field(..., description="List of body names to get trajectories for")
+    scenario: Optional[str] = Field(None, description="Scenario to read from (default namespace if omitted)")
 
 class TrajectoryData(BaseModel):
     body_name: str
     positions: dict
 
+class PorkchopInput(BaseModel):
+    origin: str = Field(..., description="Name of the departure body")
+    target: str = Field(..., description="Name of the arrival body")
+    departure_start: str = Field(..., description="Earliest departure date in YYYY-MM-DD format")
+    departure_end: str = Field(..., description="Latest departure date in YYYY-MM-DD format")
+    arrival_start: str = Field(..., description="Earliest arrival date in YYYY-MM-DD format")
+    arrival_end: str = Field(..., description="Latest arrival date in YYYY-MM-DD format")
+    departure_steps: int = Field(100, ge=1, le=1000)
+    arrival_steps: int = Field(100, ge=1, le=1000)
+    central_body: str = "Sun"
+    workers: Optional[int] = Field(None, ge=1, description="Worker processes for large grids (default: CPU count)")
+    scenario: Optional[str] = Field(None, description="Scenario to read from (default namespace if omitted)")
+
+class TargetingInput(BaseModel):
+    body_name: str
+    burn_time: float = Field(..., description="Time of the burn in seconds from reference date")
+    arrival_time: float = Field(..., description="Time by which the goal must be met, in seconds from reference date")
+    target_position: Optional[List[float]] = Field(None, min_items=3, max_items=3, description="Position to reach at arrival_time")
+    target_body: Optional[str] = Field(None, description="Body to reach at arrival_time")
+    minimize_distance: bool = Field(False, description="Minimize the distance to target_body up to arrival_time instead")
+    central_body: str = "Sun"
+    tolerance_km: float = Field(1000.0, gt=0)
+    time_step: float = Field(TARGETING_TIME_STEP, gt=0, description="Trial propagation time step in seconds")
+    commit: bool = Field(False, description="Apply the converged burn and resimulate")
+    scenario: Optional[str] = Field(None, description="Scenario to solve and commit in (default namespace if omitted)")
+
+class ManeuverPreviewInput(BaseModel):
+    body_name: str
+    delta_velocity: List[float] = Field(..., min_items=3, max_items=3)
+    simulation_time: Optional[float] = Field(None, description="Time of the burn; the body's latest state if omitted")
+    duration_hours: float = Field(720.0, gt=0, description="How far past the burn to preview")
+    samples: int = Field(500, ge=2, le=20000, description="Points in the returned trajectory")
+    scenario: Optional[str] = Field(None, description="Scenario to read from (default namespace if omitted)")
+
 class SolarSystemBody(NBodyInput):  # Inherit from NBodyInput
     pass
 
@@ -86,20 +219,26 @@ class SolarSystemBody(NBodyInput):  # Inherit from NBodyInput
 async def health_check():
     return {"status": "healthy"}
 
-@sync_to_async
-def save_bodies(bodies_data: List[NBodyInput]):
+@app.get("/startup_report", summary="Import, boot and time-to-first-request timings of this worker")
+async def get_startup_report():
+    return startup_report
+
+def save_bodies(bodies_data: List[NBodyInput], scenario: Optional[Scenario] = None):
     body_objs = []
     for b in bodies_data:
         try:
             # Try to get existing body or create new one
-            body_model = BodyModel.objects.filter(name=b.name).first()
+            body_model = BodyModel.objects.filter(scenario=scenario, name=b.name).first()
             if body_model is None:
-                body_model = BodyModel(name=b.name)
+                body_model = BodyModel(scenario=scenario, name=b.name)
             
             # Update the model with new data
             body_model.mass = b.mass
             body_model.position = b.position
             body_model.velocity = b.velocity
+            if b.snapshot_policy is not None:
+                policy_from_spec(b.snapshot_policy, SNAPSHOT_INTERVAL)
+                body_model.snapshot_policy = b.snapshot_policy
             body_model.save()
             body_objs.append(body_model)
         except Exception as e:
@@ -107,101 +246,253 @@ def save_bodies(bodies_data: List[NBodyInput]):
             raise
     return body_objs
 
-@sync_to_async
-def get_all_bodies():
-    return list(BodyModel.objects.all())
-
-@app.post("/simulate_n_bodies/")
-async def simulate_n_bodies(bodies_data: List[dict]):
+@db_reader
+def find_scenario(name: Optional[str]):
     try:
-        # Save bodies to database asynchronously using the raw function
-        body_objs = await save_bodies_raw(bodies_data)
+        return get_scenario(name)
+    except Scenario.DoesNotExist:
+        raise HTTPException(status_code=404, detail=f"Scenario {name} not found")
+
+@db_reader
+def get_all_bodies(scenario: Optional[Scenario] = None):
+    return scenario_bodies(scenario)
+
+@db_reader
+def get_bodies_by_name(names: List[str], scenario: Optional[Scenario] = None):
+    return resolve_bodies(scenario, names)
+
+@db_reader
+def get_body_versions(names: Optional[List[str]] = None, scenario: Optional[Scenario] = None):
+    # Inherited rows count too: a fork's trajectories change with its parent's.
+    bodies = BodyModel.objects.filter(namespace_filter(lineage_of(scenario)))
+    if names is not None:
+        bodies = bodies.filter(name__in=names)
+    return body_versions(bodies)
+
+def publish_ephemeris(scenario: Optional[Scenario] = None):
+    # The shared ephemeris store only holds the default namespace.
+    if scenario is None:
+        return publish_if_configured(BodyModel.objects.filter(scenario__isnull=True))
+
+def run_simulate_n_bodies(bodies_data: List[dict], scenario_name: Optional[str]):
+    # Created only once the run is admitted, so a rejected request leaves no
+    # scenario behind.
+    scenario = get_scenario(scenario_name, create=True)
+    with scenario_write_lock(scenario):
+        # Save bodies to database using the raw function
+        body_objs = save_bodies_raw(bodies_data, scenario)
 
         # Run simulation for multiple quarters
-        trajectories = await sync_to_async(simulate_quarters)(
+        trajectories = simulate_quarters(
             bodies=body_objs,
             start_time=0.0
         )
+    publish_ephemeris(scenario)
+    return trajectories
+
+@app.post("/simulate_n_bodies/")
+async def simulate_n_bodies(bodies_data: List[dict], scenario: Optional[str] = None):
+    try:
+        return await run_compute(run_simulate_n_bodies, bodies_data, scenario)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def run_simulate_parareal(bodies_data: List[dict], scenario_name: Optional[str], quarters: int, tolerance_km: float):
+    scenario = get_scenario(scenario_name, create=True)
+    with scenario_write_lock(scenario):
+        body_objs = save_bodies_raw(bodies_data, scenario)
+
+        # Quarters run side by side on the process pool
+        trajectories, report = simulate_quarters_parareal(
+            bodies=body_objs,
+            start_time=0.0,
+            quarters=quarters,
+            tolerance_km=tolerance_km
+        )
+    publish_ephemeris(scenario)
+    return {"trajectories": trajectories, "convergence": report}
 
-        return trajectories
+@app.post("/simulate_parareal/", summary="Multi-quarter simulation with the quarters integrated in parallel (Parareal)")
+async def simulate_parareal(
+    bodies_data: List[dict],
+    scenario: Optional[str] = None,
+    quarters: int = Query(QUARTERS_TO_SIMULATE, ge=1, description="Number of 90-day quarters to simulate"),
+    tolerance_km: float = Query(PARAREAL_TOLERANCE_KM, gt=0, description="Stop once no quarter boundary moves more than this between iterations")
+):
+    try:
+        return await run_compute(run_simulate_parareal, bodies_data, scenario, quarters, tolerance_km)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def run_maneuver_batch(scenario: Optional[Scenario], burns: list, should_cancel):
+    with scenario_write_lock(scenario):
+        # Resimulate once from the earliest burn, applying each at its time
+        times = [time for time, _, _ in burns]
+        start_time = None if None in times else min(times)
+
+        # Every body is resimulated, so a fork takes its own copy of each
+        bodies = own_bodies(scenario, scenario_bodies(scenario), start_time)
+        
+        trajectories = nbody_simulation_verlet(
+            bodies=bodies,
+            save_final=True,
+            start_time=start_time,
+            burns=burns,
+            should_cancel=should_cancel
+        )
+    publish_ephemeris(scenario)
+    return trajectories
+
+maneuver_scheduler = ManeuverScheduler(run_maneuver_batch)
+
 @app.post("/maneuver/", summary="Apply a maneuver to a body and simulate its trajectory")
 async def apply_maneuver_endpoint(maneuver_data: ManeuverInput):
+    """
+    Maneuvers are debounced and coalesced per scenario: requests arriving
+    close together are resimulated in one run, and a newer request for the
+    same body answers the older one with 409.
+    """
     try:
-        bodies = await get_all_bodies()
-        
-        target_body = next((b for b in bodies if b.name == maneuver_data.body_name), None)
-        if target_body is None:
+        scenario = await find_scenario(maneuver_data.scenario)
+        bodies = await get_bodies_by_name([maneuver_data.body_name], scenario)
+        if maneuver_data.body_name not in bodies:
             raise HTTPException(status_code=404, detail=f"Body {maneuver_data.body_name} not found")
-        
-        # Apply the maneuver at the specified time
-        delta_velocity = np.array(maneuver_data.delta_velocity)
-        target_body = await sync_to_async(apply_maneuver)(
-            target_body, 
-            delta_velocity,
-            simulation_time=maneuver_data.simulation_time
-        )
-        
-        # Simulate the trajectory starting from the maneuver time
-        trajectories = await sync_to_async(nbody_simulation_verlet)(
-            bodies=bodies,
-            save_final=True,
-            start_time=maneuver_data.simulation_time
+        if maneuver_data.body_name == "Sun":
+            raise ValueError("Cannot apply maneuver to the Sun as it is fixed at the origin")
+
+        return await maneuver_scheduler.submit(
+            maneuver_data.scenario,
+            scenario,
+            maneuver_data.body_name,
+            np.array(maneuver_data.delta_velocity),
+            maneuver_data.simulation_time
         )
-        
-        return trajectories
+    except HTTPException:
+        raise
+    except ManeuverSuperseded as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/maneuver_scheduler/", summary="Request, supersede and run counts of the maneuver scheduler")
+async def maneuver_scheduler_stats():
+    return maneuver_scheduler.stats
+
+@app.get("/compute_status/", summary="Load and admission counts of the simulation compute pool")
+async def compute_status():
+    return compute_admission.status()
+
+@app.get("/trajectory_cache/", summary="Size, hit, miss and eviction counts of the decoded trajectory cache")
+async def trajectory_cache_stats():
+    return trajectory_cache.stats()
+
 @app.get("/trajectory_between_dates/")
 async def get_trajectory_between_dates_endpoint(
+    request: Request,
     body_name: str,
     start_date: str,
-    end_date: str
+    end_date: str,
+    extrapolate: bool = Query(False, description="Fill dates outside the simulated window with Kepler propagation about the Sun"),
+    scenario: Optional[str] = Query(None, description="Scenario to read from (default namespace if omitted)")
 ):
     try:
-        # Get the body from database
-        body = await sync_to_async(BodyModel.objects.get)(name=body_name)
-        
-        # Get the trajectory data
-        trajectory = body.get_trajectory()
-        
-        # Filter trajectory between dates
-        filtered_trajectory = get_trajectory_between_dates(
-            trajectory,
-            start_date,
-            end_date
+        scenario_obj = await find_scenario(scenario)
+        start_seconds = date_to_seconds(start_date)
+        end_seconds = date_to_seconds(end_date)
+        extrapolate = extrapolate and body_name != "Sun"
+
+        # The Sun's mass and position feed the extrapolation, so its version
+        # is part of the validators too.
+        names = [body_name, "Sun"] if extrapolate else [body_name]
+        versions = await get_body_versions(names, scenario_obj)
+        known_names = {row[0] for row in versions}
+        for name in names:
+            if name not in known_names:
+                raise HTTPException(status_code=404, detail=f"Body {name} not found")
+
+        def build():
+            # Get the body (and the Sun, when extrapolating) in one query
+            bodies = resolve_bodies(scenario_obj, names)
+            body = bodies[body_name]
+            headers = {}
+
+            # Get the decoded trajectory and filter it between dates
+            times, positions = trajectory_arrays(body)
+            filtered_trajectory = slice_trajectory(times, positions, start_seconds, end_seconds)
+
+            if extrapolate:
+                sun = bodies["Sun"]
+                extrapolated, error_bound = fill_outside_coverage(
+                    times,
+                    positions,
+                    start_seconds,
+                    end_seconds,
+                    cadence=SNAPSHOT_INTERVAL * TIME_STEP,
+                    mu=G * sun.mass,
+                    center=sun.position,
+                    state=(body.position, body.velocity)
+                )
+                if extrapolated:
+                    filtered_trajectory = dict(sorted(
+                        {**filtered_trajectory, **extrapolated}.items(),
+                        key=lambda item: float(item[0])
+                    ))
+                    headers["X-Kepler-Error-Bound-Km"] = f"{error_bound:.3f}"
+
+            # Return the data in the requested format
+            return {body_name: filtered_trajectory}, headers
+
+        return await cached_json_response(
+            request,
+            versions,
+            ("trajectory_between_dates", scenario, body_name, start_seconds, end_seconds, extrapolate),
+            build
         )
-        
-        # Return the data in the requested format
-        return {
-            body_name: filtered_trajectory
-        }
-    except BodyModel.DoesNotExist:
-        raise HTTPException(status_code=404, detail=f"Body {body_name} not found")
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/get_trajectories/", summary="Get trajectory data for multiple bodies between dates", response_model=List[TrajectoryData])
-async def get_trajectories(data: TrajectoryRangeRequest):
+async def get_trajectories(request: Request, data: TrajectoryRangeRequest):
     try:
-        trajectories = []
-        
-        # Get trajectory data for each requested body
+        scenario = await find_scenario(data.scenario)
+        start_seconds = date_to_seconds(data.start_date)
+        end_seconds = date_to_seconds(data.end_date)
+
+        versions = await get_body_versions(data.body_names, scenario)
+        known_names = {row[0] for row in versions}
         for body_name in data.body_names:
-            try:
-                body = await sync_to_async(BodyModel.objects.get)(name=body_name)
-                trajectory = body.get_trajectory()
-                
+            if body_name not in known_names:
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"Body {body_name} not found in database"
+                )
+
+        def build():
+            trajectories = []
+            
+            # Fetch every requested body with a single IN query
+            bodies = resolve_bodies(scenario, data.body_names)
+            
+            for body_name in data.body_names:
                 # Filter trajectory between dates
-                filtered_trajectory = get_trajectory_between_dates(
-                    trajectory,
-                    data.start_date,
-                    data.end_date
+                filtered_trajectory = slice_trajectory(
+                    *trajectory_arrays(bodies[body_name]),
+                    start_seconds,
+                    end_seconds
                 )
                 
                 # Convert timestamps to dates for better readability
@@ -210,38 +501,44 @@ async def get_trajectories(data: TrajectoryRangeRequest):
                     for timestamp, position in filtered_trajectory.items()
                 }
                 
-                trajectories.append(TrajectoryData(
-                    body_name=body_name,
-                    positions=readable_trajectory
-                ))
-                
-            except BodyModel.DoesNotExist:
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"Body {body_name} not found in database"
-                )
-        
-        return trajectories
+                trajectories.append({
+                    "body_name": body_name,
+                    "positions": readable_trajectory
+                })
+            
+            return trajectories, {}
+
+        return await cached_json_response(
+            request,
+            versions,
+            ("get_trajectories", data.scenario, tuple(data.body_names), start_seconds, end_seconds),
+            build
+        )
         
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@sync_to_async
-def save_bodies_raw(bodies_data: List[dict]):
+@transaction.atomic
+def save_bodies_raw(bodies_data: List[dict], scenario: Optional[Scenario] = None):
     body_objs = []
     for b in bodies_data:
         try:
             # Try to get existing body or create new one
-            body_model = BodyModel.objects.filter(name=b["name"]).first()
+            body_model = BodyModel.objects.filter(scenario=scenario, name=b["name"]).first()
             if body_model is None:
-                body_model = BodyModel(name=b["name"])
+                body_model = BodyModel(scenario=scenario, name=b["name"])
             
             # Update the model with new data
             body_model.mass = b["mass"]
             body_model.position = b["position"]
             body_model.velocity = b["velocity"]
+            if b.get("snapshot_policy") is not None:
+                policy_from_spec(b["snapshot_policy"], SNAPSHOT_INTERVAL)
+                body_model.snapshot_policy = b["snapshot_policy"]
             body_model.save()
             body_objs.append(body_model)
         except Exception as e:
@@ -249,63 +546,662 @@ def save_bodies_raw(bodies_data: List[dict]):
             raise
     return body_objs
 
-@app.post("/simulate_solar_system/")
-async def simulate_solar_system(bodies_data: List[dict]):
-    try:
-        # Save bodies to database asynchronously using the raw function
-        body_objs = await save_bodies_raw(bodies_data)
+def run_simulate_solar_system(bodies_data: List[dict], scenario_name: Optional[str]):
+    scenario = get_scenario(scenario_name, create=True)
+    with scenario_write_lock(scenario):
+        # Save bodies to database using the raw function
+        body_objs = save_bodies_raw(bodies_data, scenario)
 
         # Run simulation with fixed parameters
-        trajectories = await sync_to_async(nbody_simulation_verlet)(
+        trajectories = nbody_simulation_verlet(
             bodies=body_objs,
             dt=TIME_STEP,  # 60 seconds
             steps=STEPS_PER_QUARTER,  # 90 days worth of steps
             snapshot_interval=SNAPSHOT_INTERVAL,  # 52
             save_final=True
         )
+    publish_ephemeris(scenario)
+    return trajectories
 
-        return trajectories
+@app.post("/simulate_solar_system/")
+async def simulate_solar_system(bodies_data: List[dict], scenario: Optional[str] = None):
+    try:
+        return await run_compute(run_simulate_solar_system, bodies_data, scenario)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/all_trajectories/")
 async def get_all_trajectories_endpoint(
+    request: Request,
     start_date: str,
-    end_date: str
+    end_date: str,
+    scenario: Optional[str] = Query(None, description="Scenario to read from (default namespace if omitted)")
 ):
     try:
-        # Get all bodies from database
-        bodies = await get_all_bodies()
-        print(f"Retrieved {len(bodies)} bodies from database")
-        
-        # Create a dictionary to store all trajectories
-        all_trajectories = {}
-        
-        # Get trajectory data for each body
-        for body in bodies:
-            trajectory = body.get_trajectory()
-            print(f"Body {body.name} has {len(trajectory)} trajectory points")
-            print(f"Trajectory time range: {min(float(t) for t in trajectory.keys() if trajectory)} to {max(float(t) for t in trajectory.keys() if trajectory)} seconds")
-            
-            # Convert start and end dates to seconds
-            start_seconds = date_to_seconds(start_date)
-            end_seconds = date_to_seconds(end_date)
+        scenario_obj = await find_scenario(scenario)
+
+        # Convert start and end dates to seconds
+        start_seconds = date_to_seconds(start_date)
+        end_seconds = date_to_seconds(end_date)
+
+        versions = await get_body_versions(scenario=scenario_obj)
+
+        def build():
+            # Get all bodies from database
+            bodies = scenario_bodies(scenario_obj)
+            print(f"Retrieved {len(bodies)} bodies from database")
             print(f"Filtering between {start_seconds} to {end_seconds} seconds")
             
-            # Filter trajectory between dates
-            filtered_trajectory = get_trajectory_between_dates(
-                trajectory,
-                start_date,
-                end_date
-            )
-            print(f"After filtering: {len(filtered_trajectory)} points")
+            # Create a dictionary to store all trajectories
+            all_trajectories = {}
             
-            # Add to the result dictionary
-            all_trajectories[body.name] = filtered_trajectory
-        
-        return all_trajectories
+            # Get trajectory data for each body
+            for body in bodies:
+                filtered_trajectory = slice_trajectory(*trajectory_arrays(body), start_seconds, end_seconds)
+                print(f"Body {body.name}: {len(filtered_trajectory)} points after filtering")
+                
+                # Add to the result dictionary
+                all_trajectories[body.name] = filtered_trajectory
+            
+            return all_trajectories, {}
+
+        return await cached_json_response(
+            request,
+            versions,
+            ("all_trajectories", scenario, start_seconds, end_seconds),
+            build
+        )
         
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/close_approaches/", summary="Find when bodies come within a distance of each other between dates")
+async def close_approaches_endpoint(
+    threshold_km: float,
+    start_date: str,
+    end_date: str,
+    body_name: Optional[str] = None,
+    other_body: Optional[str] = None,
+    scenario: Optional[str] = Query(None, description="Scenario to read from (default namespace if omitted)")
+):
+    try:
+        if threshold_km <= 0:
+            raise ValueError("threshold_km must be positive")
+        if other_body is not None and body_name is None:
+            raise ValueError("other_body requires body_name")
+
+        start_seconds = date_to_seconds(start_date)
+        end_seconds = date_to_seconds(end_date)
+
+        bodies = await get_all_bodies(await find_scenario(scenario))
+        known_names = {body.name for body in bodies}
+        for name in (body_name, other_body):
+            if name is not None and name not in known_names:
+                raise HTTPException(status_code=404, detail=f"Body {name} not found")
+
+        return await run_compute(
+            find_close_approaches_between_bodies,
+            bodies,
+            threshold_km,
+            start_seconds,
+            end_seconds,
+            body_name=body_name,
+            other_body=other_body
+        )
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def run_porkchop(origin: BodyModel, target: BodyModel, central: BodyModel, departure_times: np.ndarray,
+                 arrival_times: np.ndarray, mu: float, workers: Optional[int] = None) -> dict:
+    # Decoding the stored trajectories is heavy enough to keep off the event loop.
+    return porkchop_grid(
+        trajectory_arrays(origin),
+        trajectory_arrays(target),
+        trajectory_arrays(central),
+        departure_times,
+        arrival_times,
+        mu=mu,
+        workers=workers
+    )
+
+
+@app.post("/porkchop/", summary="Compute a launch-window (porkchop) grid between two bodies")
+async def porkchop_endpoint(data: PorkchopInput):
+    try:
+        scenario = await find_scenario(data.scenario)
+        bodies = await get_bodies_by_name([data.origin, data.target, data.central_body], scenario)
+        for name in (data.origin, data.target, data.central_body):
+            if name not in bodies:
+                raise HTTPException(status_code=404, detail=f"Body {name} not found")
+
+        departure_times = np.linspace(date_to_seconds(data.departure_start), date_to_seconds(data.departure_end), data.departure_steps)
+        arrival_times = np.linspace(date_to_seconds(data.arrival_start), date_to_seconds(data.arrival_end), data.arrival_steps)
+
+        grid = await run_compute(
+            run_porkchop,
+            bodies[data.origin],
+            bodies[data.target],
+            bodies[data.central_body],
+            departure_times,
+            arrival_times,
+            mu=G * bodies[data.central_body].mass,
+            workers=data.workers
+        )
+
+        response = {
+            "departure_dates": [seconds_to_date(t) for t in departure_times],
+            "arrival_dates": [seconds_to_date(t) for t in arrival_times],
+            "c3_km2_s2": grid["c3"],
+            "departure_dv_km_s": grid["departure_dv"],
+            "arrival_dv_km_s": grid["arrival_dv"],
+            "total_dv_km_s": grid["total_dv"],
+        }
+        total_dv = grid["total_dv"]
+        if np.isfinite(total_dv).any():
+            i, j = np.unravel_index(np.nanargmin(total_dv), total_dv.shape)
+            response["best"] = {
+                "departure_date": response["departure_dates"][i],
+                "arrival_date": response["arrival_dates"][j],
+                "c3_km2_s2": float(grid["c3"][i, j]),
+                "total_dv_km_s": float(total_dv[i, j]),
+            }
+        else:
+            response["best"] = None
+
+        # NaN marks impossible cells and is not valid JSON.
+        for key in ("c3_km2_s2", "departure_dv_km_s", "arrival_dv_km_s", "total_dv_km_s"):
+            matrix = response[key]
+            response[key] = np.where(np.isfinite(matrix), matrix, None).tolist()
+
+        return response
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def run_targeting(data: TargetingInput, scenario: Optional[Scenario]):
+    bodies = scenario_bodies(scenario)
+    by_name = {body.name: body for body in bodies}
+    for name in (data.body_name, data.target_body, data.central_body):
+        if name is not None and name not in by_name:
+            raise HTTPException(status_code=404, detail=f"Body {name} not found")
+
+    ephemerides = {body.name: trajectory_arrays(body) for body in bodies}
+    perturbers = [
+        (body.mass, *ephemerides[body.name])
+        for body in bodies
+        if body.name != data.body_name and len(ephemerides[body.name][0]) >= 2
+    ]
+
+    position, velocity = get_state_at_time(by_name[data.body_name], data.burn_time)
+    solution = solve_burn(
+        position,
+        velocity,
+        data.burn_time,
+        data.arrival_time,
+        perturbers,
+        G,
+        target_position=data.target_position,
+        target_ephemeris=ephemerides[data.target_body] if data.target_body else None,
+        minimize_distance=data.minimize_distance,
+        central_mu=G * by_name[data.central_body].mass,
+        central_position=ephemerides[data.central_body],
+        tolerance_km=data.tolerance_km,
+        dt=data.time_step
+    )
+    delta_v = solution["delta_velocity"]
+
+    if data.commit:
+        # At least the usual quarter, and long enough to reach the arrival.
+        steps = max(STEPS_PER_QUARTER, int(np.ceil((data.arrival_time - data.burn_time) / TIME_STEP)))
+        with scenario_write_lock(scenario):
+            trajectories = nbody_simulation_verlet(
+                bodies=own_bodies(scenario, scenario_bodies(scenario), data.burn_time),
+                steps=steps,
+                save_final=True,
+                start_time=data.burn_time,
+                maneuvers={data.body_name: delta_v}
+            )
+        publish_ephemeris(scenario)
+        trajectory = trajectories[data.body_name]
+    else:
+        record_every = max(int(round(SNAPSHOT_INTERVAL * TIME_STEP / data.time_step)), 1)
+        preview = propagate_test_particles(
+            position[None, :], (velocity + delta_v)[None, :],
+            data.burn_time, data.arrival_time, perturbers, G, data.time_step,
+            record_every=record_every
+        )
+        trajectory = {f"{float(t)}": p[0].tolist() for t, p in zip(preview["times"], preview["positions"])}
+
+    response = {
+        "body_name": data.body_name,
+        "delta_velocity": delta_v.tolist(),
+        "miss_distance_km": solution["miss_distance_km"],
+        "iterations": solution["iterations"],
+        "converged": solution["converged"],
+        "committed": data.commit,
+        "trajectory": trajectory,
+    }
+    if "closest_approach_time" in solution:
+        response["closest_approach_time"] = solution["closest_approach_time"]
+    return response
+
+@app.post("/target_maneuver/", summary="Solve for the burn that reaches a goal and return the resulting trajectory")
+async def target_maneuver_endpoint(data: TargetingInput):
+    try:
+        if data.arrival_time <= data.burn_time:
+            raise ValueError("arrival_time must be after burn_time")
+        goals = sum([data.target_position is not None, data.target_body is not None and not data.minimize_distance, data.minimize_distance])
+        if goals != 1:
+            raise ValueError("Specify exactly one goal: target_position, target_body, or target_body with minimize_distance")
+        if data.minimize_distance and data.target_body is None:
+            raise ValueError("minimize_distance requires target_body")
+        if data.body_name == "Sun":
+            raise ValueError("Cannot apply maneuver to the Sun as it is fixed at the origin")
+
+        scenario = await find_scenario(data.scenario)
+        return await run_compute(run_targeting, data, scenario)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@db_reader
+def run_kepler_preview(body_names: Optional[List[str]], central_body: str, query_times: np.ndarray, scenario: Optional[Scenario] = None):
+    bodies = scenario_bodies(scenario)
+    by_name = {body.name: body for body in bodies}
+    if central_body not in by_name:
+        raise HTTPException(status_code=404, detail=f"Body {central_body} not found")
+    for name in body_names or []:
+        if name not in by_name:
+            raise HTTPException(status_code=404, detail=f"Body {name} not found")
+
+    central = by_name[central_body]
+    mu = G * central.mass
+    center = central.position
+    names = [name for name in (body_names or by_name) if name != central_body]
+
+    epochs = []
+    error_scales = {}
+    for name in names:
+        body = by_name[name]
+        times, positions = trajectory_arrays(body)
+        relative_state = (body.position - center, body.velocity - central.velocity)
+        if len(times) >= 2:
+            epoch = epoch_state(times, positions - center, mu, at_end=True, state=relative_state)
+            error_scales[name] = kepler_error_scale(times, positions - center, epoch, mu)
+        else:
+            # Never simulated: the stored state is the initial state at time zero.
+            epoch = (0.0, *relative_state)
+        epochs.append(epoch)
+
+    positions = preview_positions(epochs, query_times, mu, center=center) if epochs else np.empty((0, len(query_times), 3))
+
+    trajectories = {}
+    error_bounds = {}
+    for name, epoch, body_positions in zip(names, epochs, positions):
+        # null where the Kepler solve did not converge
+        trajectories[name] = {
+            f"{float(t)}": p.tolist() if np.all(np.isfinite(p)) else None
+            for t, p in zip(query_times, body_positions)
+        }
+        if name in error_scales:
+            error_bounds[name] = float(kepler_error_bound(*error_scales[name], query_times - epoch[0]).max())
+        else:
+            error_bounds[name] = None
+    return {"trajectories": trajectories, "error_bound_km": error_bounds}
+
+@db_reader
+def run_maneuver_preview(data: ManeuverPreviewInput, scenario: Optional[Scenario] = None):
+    bodies = scenario_bodies(scenario)
+    by_name = {body.name: body for body in bodies}
+    if data.body_name not in by_name:
+        raise HTTPException(status_code=404, detail=f"Body {data.body_name} not found")
+    if data.body_name == "Sun":
+        raise ValueError("Cannot apply maneuver to the Sun as it is fixed at the origin")
+
+    body = by_name[data.body_name]
+    times, positions = trajectory_arrays(body)
+    if data.simulation_time is None:
+        # The stored state is the state at the end of the stored trajectory.
+        burn_time = float(times[-1]) if len(times) else 0.0
+        position, velocity = body.position, body.velocity
+    elif len(times) >= 2:
+        burn_time = data.simulation_time
+        position, velocity = (state[0] for state in interpolate_states(times, positions, [burn_time]))
+    else:
+        burn_time = data.simulation_time
+        position, velocity = body.position, body.velocity
+    velocity = velocity + np.array(data.delta_velocity, dtype=float)
+
+    attractors = [
+        Attractor(other.name, other.mass, *trajectory_arrays(other), position=other.position, velocity=other.velocity)
+        for other in bodies if other.name != data.body_name
+    ]
+    if not attractors:
+        raise ValueError("No other bodies to propagate about")
+
+    query_times = np.linspace(burn_time, burn_time + data.duration_hours * 3600, data.samples)
+
+    preview = patched_conic_preview(position, velocity, burn_time, query_times, attractors, G)
+    return {
+        "body_name": data.body_name,
+        "trajectory": {f"{float(t)}": p.tolist() for t, p in zip(preview["times"], preview["positions"])},
+        "segments": [
+            {"central_body": name, "start_time": start, "end_time": end}
+            for name, start, end in preview["segments"]
+        ],
+    }
+
+@app.post("/maneuver_preview/", summary="Instant patched-conic preview of a maneuver, without resimulating")
+async def maneuver_preview_endpoint(data: ManeuverPreviewInput):
+    """
+    Propagates only the maneuvered body, on Kepler arcs about whichever body's
+    sphere of influence it is in, so it answers in milliseconds while a
+    maneuver node is dragged. Nothing is saved; POST /maneuver/ with the same
+    burn runs the full simulation once the burn is committed.
+    """
+    try:
+        scenario = await find_scenario(data.scenario)
+        return await run_maneuver_preview(data, scenario)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/kepler_preview/", summary="Fast analytic (Kepler) preview of body positions between dates")
+async def kepler_preview_endpoint(
+    start_date: str,
+    end_date: str,
+    step_hours: float = Query(24.0, gt=0),
+    body_names: Optional[List[str]] = Query(None),
+    central_body: str = "Sun",
+    scenario: Optional[str] = Query(None, description="Scenario to read from (default namespace if omitted)")
+):
+    try:
+        start_seconds = date_to_seconds(start_date)
+        end_seconds = date_to_seconds(end_date)
+        if end_seconds < start_seconds:
+            raise ValueError("end_date must not be before start_date")
+        query_times = np.arange(start_seconds, end_seconds + 1e-9, step_hours * 3600)
+        if len(query_times) > 100_000:
+            raise ValueError("Too many samples requested; increase step_hours")
+
+        return await run_kepler_preview(body_names, central_body, query_times, await find_scenario(scenario))
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@db_reader
+def run_elements_history(body_name: str, central_body: str, start_seconds: float, end_seconds: float, scenario: Optional[Scenario] = None):
+    bodies = resolve_bodies(scenario, [body_name, central_body])
+    for name in (body_name, central_body):
+        if name not in bodies:
+            raise HTTPException(status_code=404, detail=f"Body {name} not found")
+
+    times, positions = trajectory_arrays(bodies[body_name])
+    central_times, central_positions = trajectory_arrays(bodies[central_body])
+    if len(times) < 2 or len(central_times) < 2:
+        raise ValueError("Both bodies need a stored trajectory")
+
+    # Velocities need the neighbouring samples, so differentiate before clipping to the window.
+    positions, velocities = interpolate_states(times, positions, times)
+    window = (times >= start_seconds) & (times <= end_seconds)
+    times, positions, velocities = times[window], positions[window], velocities[window]
+    central_positions, central_velocities = interpolate_states(central_times, central_positions, times)
+
+    elements = state_to_elements(
+        positions - central_positions,
+        velocities - central_velocities,
+        G * bodies[central_body].mass
+    )
+
+    def column(values, degrees=False):
+        values = np.degrees(values) if degrees else values
+        return np.where(np.isfinite(values), values, None).tolist()
+
+    return {
+        "body_name": body_name,
+        "central_body": central_body,
+        "times": times.tolist(),
+        "semi_major_axis_km": column(elements["a"]),
+        "eccentricity": column(elements["ecc"]),
+        "inclination_deg": column(elements["inc"], degrees=True),
+        "raan_deg": column(elements["raan"], degrees=True),
+        "arg_periapsis_deg": column(elements["argp"], degrees=True),
+        "true_anomaly_deg": column(elements["nu"], degrees=True),
+    }
+
+@app.get("/orbital_elements/", summary="Classical orbital elements at every stored snapshot between dates")
+async def orbital_elements_endpoint(
+    body_name: str,
+    start_date: str,
+    end_date: str,
+    central_body: str = "Sun",
+    scenario: Optional[str] = Query(None, description="Scenario to read from (default namespace if omitted)")
+):
+    try:
+        return await run_elements_history(
+            body_name,
+            central_body,
+            date_to_seconds(start_date),
+            date_to_seconds(end_date),
+            await find_scenario(scenario)
+        )
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Samples per chunk when streaming a mapped slice, bounding the bytes copied at once.
+SLICE_CHUNK_SAMPLES = 65536
+
+@app.get("/ephemeris_slice/{body_name}", summary="Raw float64 trajectory slice served from the shared memory-mapped ephemeris")
+async def ephemeris_slice_endpoint(body_name: str, start_date: str, end_date: str):
+    """
+    Body layout: `count` little-endian float64 times followed by `count` rows
+    of x, y, z float64 positions, with `count` in the X-Sample-Count header.
+    """
+    try:
+        window = mapped_window(body_name, date_to_seconds(start_date), date_to_seconds(end_date))
+        if window is None:
+            raise HTTPException(status_code=404, detail=f"Body {body_name} not found in the ephemeris store")
+        times, positions = window
+
+        def chunks():
+            for array in (times, positions):
+                for start in range(0, len(array), SLICE_CHUNK_SAMPLES):
+                    yield array[start:start + SLICE_CHUNK_SAMPLES].astype("<f8", copy=False).tobytes()
+
+        return StreamingResponse(
+            chunks(),
+            media_type="application/octet-stream",
+            headers={"X-Sample-Count": str(len(times))}
+        )
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+EXPORT_MEDIA_TYPES = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+@app.get("/export_trajectories/", summary="Trajectories, derived velocities and body metadata as an Arrow IPC stream or Parquet file")
+async def export_trajectories_endpoint(
+    format: str = Query("arrow", description="arrow (IPC stream) or parquet"),
+    bodies: Optional[List[str]] = Query(None, description="Bodies to include (all if omitted)"),
+    columns: Optional[List[str]] = Query(None, description=f"Columns to include, of {', '.join(TRAJECTORY_COLUMNS)}"),
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    scenario: Optional[str] = Query(None, description="Scenario to read from (default namespace if omitted)")
+):
+    """
+    Body metadata (mass, state, snapshot policy) is in the schema metadata
+    under "orbits.bodies"; `python manage.py import_trajectories` seeds a
+    scenario from the saved response.
+    """
+    try:
+        scenario_obj = await find_scenario(scenario)
+        start_seconds = date_to_seconds(start_date) if start_date else None
+        end_seconds = date_to_seconds(end_date) if end_date else None
+
+        if bodies:
+            found = await get_bodies_by_name(bodies, scenario_obj)
+            missing = [name for name in bodies if name not in found]
+            if missing:
+                raise HTTPException(status_code=404, detail=f"Bodies not found: {', '.join(missing)}")
+            selected = [found[name] for name in bodies]
+        else:
+            selected = await get_all_bodies(scenario_obj)
+
+        # Builds the body metadata, which reads each body's scenario, so not on the loop.
+        chunks = await run_db(stream_export, selected, format, start_seconds, end_seconds, columns)
+        return StreamingResponse(
+            chunks,
+            media_type=EXPORT_MEDIA_TYPES[format],
+            headers={"Content-Disposition": f'attachment; filename="trajectories.{format}"'}
+        )
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def encode_window(body: BodyModel, start_seconds: float, end_seconds: float, precision: float) -> tuple:
+    # Decoding the stored trajectory and encoding the window both block.
+    times, positions = trajectory_arrays(body)
+    first = int(np.searchsorted(times, start_seconds, side="left"))
+    last = int(np.searchsorted(times, end_seconds, side="right"))
+    return encode_trajectory(times[first:last], positions[first:last], precision=precision), last - first
+
+
+@app.get("/trajectory_encoded/{body_name}", summary="Trajectory between dates in the compact binary codec format")
+async def trajectory_encoded_endpoint(
+    request: Request,
+    body_name: str,
+    start_date: str,
+    end_date: str,
+    precision: float = Query(1e-10, gt=0, description="Quantization step relative to the body's orbit scale"),
+    scenario: Optional[str] = Query(None, description="Scenario to read from (default namespace if omitted)")
+):
+    """
+    The body is an orbits.codec blob: decode it with
+    orbits.codec.decode_trajectory or a port of it.
+    """
+    try:
+        start_seconds = date_to_seconds(start_date)
+        end_seconds = date_to_seconds(end_date)
+
+        scenario_obj = await find_scenario(scenario)
+        versions = await get_body_versions([body_name], scenario_obj)
+        if not versions:
+            raise HTTPException(status_code=404, detail=f"Body {body_name} not found")
+
+        etag = make_etag(versions, "trajectory_encoded", scenario, start_seconds, end_seconds, precision)
+        if is_not_modified(request.headers, etag, None):
+            return Response(status_code=304, headers={"ETag": etag})
+
+        bodies = await get_bodies_by_name([body_name], scenario_obj)
+        content, count = await run_db(encode_window, bodies[body_name], start_seconds, end_seconds, precision)
+
+        return Response(
+            content=content,
+            media_type="application/octet-stream",
+            headers={"ETag": etag, "X-Sample-Count": str(count)}
+        )
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def scenario_to_dict(scenario: Scenario) -> dict:
+    return {
+        "name": scenario.name,
+        "parent": scenario.parent.name if scenario.parent else None,
+        "is_fork": scenario.is_fork,
+        "own_bodies": scenario.bodies.count(),
+        "created_at": scenario.created_at.isoformat(),
+    }
+
+def create_scenario(data: ScenarioInput):
+    if Scenario.objects.filter(name=data.name).exists():
+        raise ValueError(f"Scenario {data.name} already exists")
+    parent = get_scenario(data.parent) if data.parent is not None else None
+    if data.fork:
+        scenario = fork_scenario(data.name, parent)
+    else:
+        scenario = Scenario.objects.create(name=data.name, parent=parent)
+    return scenario_to_dict(scenario)
+
+@app.post("/scenarios/", summary="Create a scenario, by default a copy-on-write fork of another one")
+async def create_scenario_endpoint(data: ScenarioInput):
+    try:
+        return await run_write(create_scenario, data)
+    except Scenario.DoesNotExist:
+        raise HTTPException(status_code=404, detail=f"Scenario {data.parent} not found")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@db_reader
+def list_scenarios():
+    return [scenario_to_dict(scenario) for scenario in Scenario.objects.select_related("parent").order_by("name")]
+
+@app.get("/scenarios/", summary="List scenarios")
+async def list_scenarios_endpoint():
+    try:
+        return await list_scenarios()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def delete_scenario(name: str):
+    scenario = get_scenario(name)
+    with scenario_write_lock(scenario):
+        if scenario.forks.exists():
+            raise HTTPException(status_code=409, detail=f"Scenario {name} still has forks")
+        scenario.delete()
+    return {"deleted": name}
+
+@app.delete("/scenarios/{name}", summary="Delete a scenario and the bodies it owns")
+async def delete_scenario_endpoint(name: str):
+    try:
+        return await run_write(delete_scenario, name)
+    except HTTPException:
+        raise
+    except Scenario.DoesNotExist:
+        raise HTTPException(status_code=404, detail=f"Scenario {name} not found")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
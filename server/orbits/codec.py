@@ -0,0 +1,146 @@
+import struct
+import zlib
+
+import numpy as np
+
+# Quantization step relative to the body's orbit scale (largest distance
+# from the origin in the trajectory). 1e-10 of 1 AU is about 1.5 cm.
+DEFAULT_PRECISION = 1e-10
+
+# Step used when every position is at the origin (the Sun).
+MINIMUM_STEP = 1e-9  # km
+
+COMPRESSION_LEVEL = 6
+
+MAGIC = b"TRJ1"
+# magic, time mode, sample count, position step in km
+HEADER = struct.Struct("<4sBId")
+# residual width in bytes, first two residuals, compressed size
+STREAM_HEADER = struct.Struct("<BqqI")
+
+TIMES_INTEGER = 0
+TIMES_RAW = 1
+
+WIDTHS = ((1, np.int8, np.uint8), (2, np.int16, np.uint16), (4, np.int32, np.uint32), (8, np.int64, np.uint64))
+
+
+def _second_difference(values: np.ndarray) -> np.ndarray:
+    # Linear prediction from the two previous samples; the first two
+    # residuals carry the starting value and slope.
+    first = np.diff(values, prepend=0)
+    return np.diff(first, prepend=0)
+
+
+def _pack(values: np.ndarray) -> bytes:
+    """
+    Encode one integer stream: second-difference residuals, stored at the
+    narrowest width that holds them after the first two, zigzag-encoded so
+    small negative residuals stay small, byte-shuffled so the high bytes of
+    every value form long runs, then zlib-compressed.
+    """
+    residuals = _second_difference(values)
+    head = np.zeros(2, dtype=np.int64)
+    head[:len(residuals[:2])] = residuals[:2]
+    tail = residuals[2:]
+
+    largest = int(np.abs(tail).max()) if len(tail) else 0
+    width, signed, unsigned = next(w for w in WIDTHS if largest < 2**(8 * w[0] - 2))
+    tail = tail.astype(signed)
+    zigzag = ((tail << 1) ^ (tail >> (8 * width - 1))).view(unsigned)
+    shuffled = np.ascontiguousarray(zigzag.view(np.uint8).reshape(-1, width).T)
+
+    data = zlib.compress(shuffled.tobytes(), COMPRESSION_LEVEL)
+    return STREAM_HEADER.pack(width, int(head[0]), int(head[1]), len(data)) + data
+
+
+def _unpack(blob: bytes, offset: int, count: int) -> tuple:
+    """Decode one stream written by _pack; returns (values, offset after the stream)."""
+    width, first, second, size = STREAM_HEADER.unpack_from(blob, offset)
+    offset += STREAM_HEADER.size
+    _, signed, unsigned = next(w for w in WIDTHS if w[0] == width)
+
+    shuffled = np.frombuffer(zlib.decompress(blob[offset:offset + size]), dtype=np.uint8).reshape(width, -1)
+    zigzag = np.ascontiguousarray(shuffled.T).view(unsigned).ravel()
+    tail = (zigzag >> unsigned(1)).view(signed) ^ -(zigzag & unsigned(1)).view(signed)
+
+    residuals = np.empty(count, dtype=np.int64)
+    residuals[:2] = (first, second)[:count]
+    residuals[2:] = tail
+    return np.cumsum(np.cumsum(residuals, out=residuals), out=residuals), offset + size
+
+
+def position_step(positions: np.ndarray, precision: float = DEFAULT_PRECISION) -> float:
+    """Quantization step in km for a trajectory: `precision` times its orbit scale."""
+    scale = float(np.max(np.abs(positions))) if len(positions) else 0.0
+    return max(scale * precision, MINIMUM_STEP)
+
+
+def encode_trajectory(times: np.ndarray, positions: np.ndarray, precision: float = DEFAULT_PRECISION) -> bytes:
+    """
+    Encode a sampled trajectory into a compact binary blob.
+
+    Positions are quantized to integers of `position_step` km, so each
+    coordinate is off by at most half a step after decoding, and each axis
+    is encoded as its own stream (see _pack). Times are kept exact: whole
+    seconds go through the same pipeline, anything else is stored as raw
+    float64.
+
+    Args:
+        times: sorted sample times in seconds, shape (n,)
+        positions: sample positions in km, shape (n, 3)
+        precision: quantization step relative to the orbit scale
+
+    Returns:
+        bytes: the encoded trajectory
+    """
+    times = np.asarray(times, dtype=float)
+    positions = np.asarray(positions, dtype=float).reshape(-1, 3)
+    count = len(times)
+
+    if np.all(times == np.rint(times)) and np.all(np.abs(times) < 2**53):
+        time_mode = TIMES_INTEGER
+        time_data = _pack(times.astype(np.int64))
+    else:
+        time_mode = TIMES_RAW
+        raw = zlib.compress(times.tobytes(), COMPRESSION_LEVEL)
+        time_data = struct.pack("<I", len(raw)) + raw
+
+    step = position_step(positions, precision)
+    quantized = np.rint(positions / step).astype(np.int64)
+    position_data = b"".join(_pack(np.ascontiguousarray(quantized[:, axis])) for axis in range(3))
+
+    return HEADER.pack(MAGIC, time_mode, count, step) + time_data + position_data
+
+
+def decode_trajectory(blob) -> tuple:
+    """
+    Decode a blob written by encode_trajectory.
+
+    Returns:
+        tuple: (times, positions) with shapes (n,) and (n, 3)
+    """
+    blob = bytes(blob)
+    magic, time_mode, count, step = HEADER.unpack_from(blob)
+    if magic != MAGIC:
+        raise ValueError("Not an encoded trajectory")
+    offset = HEADER.size
+
+    if time_mode == TIMES_INTEGER:
+        times, offset = _unpack(blob, offset, count)
+        times = times.astype(float)
+    else:
+        (size,) = struct.unpack_from("<I", blob, offset)
+        offset += 4
+        times = np.frombuffer(zlib.decompress(blob[offset:offset + size]), dtype=float).copy()
+        offset += size
+
+    # Fill axis by axis into contiguous rows and hand back the transposed view.
+    positions = np.empty((3, count))
+    for axis in range(3):
+        values, offset = _unpack(blob, offset, count)
+        np.multiply(values, step, out=positions[axis])
+    return times, positions.T
+
+
+def is_encoded(data) -> bool:
+    return data is not None and bytes(data[:len(MAGIC)]) == MAGIC
@@ -0,0 +1,271 @@
+import numpy as np
+
+from .ephemeris import trajectory_arrays
+from .utils import seconds_to_date
+
+
+class SegmentIndex:
+    """
+    Time-ordered bounding volume hierarchy over a body's trajectory.
+
+    Each trajectory segment [t_i, t_i+1] is bounded by the axis-aligned box
+    swept by the straight line between its two samples. Level 0 holds one
+    box per segment, and every following level merges pairs of nodes from
+    the level below until a single root covers the whole trajectory.
+    """
+
+    def __init__(self, times: np.ndarray, positions: np.ndarray):
+        if len(times) < 2:
+            raise ValueError("At least two trajectory points are needed to build a segment index")
+
+        self.times = times
+        self.positions = positions
+
+        start = positions[:-1]
+        end = positions[1:]
+        self.levels = [{
+            "t0": times[:-1],
+            "t1": times[1:],
+            "lo": np.minimum(start, end),
+            "hi": np.maximum(start, end),
+        }]
+
+        while len(self.levels[-1]["t0"]) > 1:
+            self.levels.append(self._merge(self.levels[-1]))
+
+    @classmethod
+    def from_arrays(cls, times: np.ndarray, positions: np.ndarray, start_time: float = None, end_time: float = None):
+        """
+        Build an index from trajectory arrays, optionally clipped to a time window.
+        Segments that straddle the window edges are kept whole.
+        """
+        first = 0 if start_time is None else max(np.searchsorted(times, start_time, side="right") - 1, 0)
+        last = len(times) if end_time is None else np.searchsorted(times, end_time, side="left") + 1
+        return cls(times[first:last], positions[first:last])
+
+    @staticmethod
+    def _merge(level: dict) -> dict:
+        count = len(level["t0"])
+        left = np.arange(0, count, 2)
+        right = np.minimum(left + 1, count - 1)
+        return {
+            "t0": level["t0"][left],
+            "t1": level["t1"][right],
+            "lo": np.minimum(level["lo"][left], level["lo"][right]),
+            "hi": np.maximum(level["hi"][left], level["hi"][right]),
+        }
+
+    @property
+    def depth(self) -> int:
+        return len(self.levels)
+
+    def level(self, depth: int) -> dict:
+        """Return the level at the given depth, repeating the root above the top."""
+        return self.levels[min(depth, len(self.levels) - 1)]
+
+
+def _box_gap(lo_a, hi_a, lo_b, hi_b):
+    """Smallest distance between two sets of axis-aligned boxes."""
+    gap = np.maximum(0.0, np.maximum(lo_a - hi_b, lo_b - hi_a))
+    return np.linalg.norm(gap, axis=-1)
+
+
+def _prune(index_a: SegmentIndex, index_b: SegmentIndex, depth: int, ia, ib, threshold: float, start_time, end_time):
+    level_a = index_a.level(depth)
+    level_b = index_b.level(depth)
+
+    t0 = np.maximum(level_a["t0"][ia], level_b["t0"][ib])
+    t1 = np.minimum(level_a["t1"][ia], level_b["t1"][ib])
+    keep = t0 <= t1
+    if start_time is not None:
+        keep &= t1 >= start_time
+    if end_time is not None:
+        keep &= t0 <= end_time
+
+    gap = _box_gap(level_a["lo"][ia], level_a["hi"][ia], level_b["lo"][ib], level_b["hi"][ib])
+    keep &= gap <= threshold
+    return ia[keep], ib[keep]
+
+
+def _children(index: SegmentIndex, depth: int, nodes: np.ndarray):
+    """Children of the given nodes one level below `depth`, as (parent position, child) pairs."""
+    if depth >= index.depth:
+        # Above this index's root the node simply repeats itself.
+        return np.arange(len(nodes)), nodes
+    count = len(index.levels[depth - 1]["t0"])
+    parents = np.repeat(np.arange(len(nodes)), 2)
+    children = np.repeat(nodes * 2, 2) + np.tile([0, 1], len(nodes))
+    valid = children < count
+    return parents[valid], children[valid]
+
+
+def candidate_segment_pairs(index_a: SegmentIndex, index_b: SegmentIndex, threshold: float,
+                            start_time: float = None, end_time: float = None):
+    """
+    Walk both hierarchies together and return the segment pairs whose swept
+    boxes overlap in time and come within `threshold` km of each other.
+
+    Returns:
+        tuple: (segments of a, segments of b) as index arrays
+    """
+    depth = max(index_a.depth, index_b.depth) - 1
+    ia = np.zeros(1, dtype=int)
+    ib = np.zeros(1, dtype=int)
+    ia, ib = _prune(index_a, index_b, depth, ia, ib, threshold, start_time, end_time)
+
+    while depth > 0 and len(ia):
+        parent_a, child_a = _children(index_a, depth, ia)
+        parent_b, child_b = _children(index_b, depth, ib)
+
+        # Cross every child of a pair's first node with every child of its second node.
+        order_b = np.argsort(parent_b, kind="stable")
+        parent_b = parent_b[order_b]
+        child_b = child_b[order_b]
+        starts = np.searchsorted(parent_b, parent_a, side="left")
+        counts = np.searchsorted(parent_b, parent_a, side="right") - starts
+        new_a = np.repeat(child_a, counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        new_b = child_b[np.repeat(starts, counts) + offsets]
+
+        depth -= 1
+        ia, ib = _prune(index_a, index_b, depth, new_a, new_b, threshold, start_time, end_time)
+
+    return ia, ib
+
+
+def refine_segment_pairs(index_a: SegmentIndex, index_b: SegmentIndex, ia, ib, threshold: float,
+                         start_time: float = None, end_time: float = None):
+    """
+    Exact minimum distance for each candidate segment pair.
+
+    Both bodies move linearly within a segment, so their separation is a
+    linear function of time over the shared interval and both its minimum
+    and the times it crosses `threshold` have closed forms.
+
+    Returns:
+        tuple: (times of closest approach, distances in km,
+                entry times, exit times) where entry/exit bound the part
+                of the shared interval spent within `threshold`
+    """
+    ta0, ta1 = index_a.times[ia], index_a.times[ia + 1]
+    tb0, tb1 = index_b.times[ib], index_b.times[ib + 1]
+    t0 = np.maximum(ta0, tb0)
+    t1 = np.minimum(ta1, tb1)
+    if start_time is not None:
+        t0 = np.maximum(t0, start_time)
+    if end_time is not None:
+        t1 = np.minimum(t1, end_time)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        vel_a = (index_a.positions[ia + 1] - index_a.positions[ia]) / (ta1 - ta0)[:, None]
+        vel_b = (index_b.positions[ib + 1] - index_b.positions[ib]) / (tb1 - tb0)[:, None]
+    vel_a = np.nan_to_num(vel_a)
+    vel_b = np.nan_to_num(vel_b)
+
+    pos_a = index_a.positions[ia] + vel_a * (t0 - ta0)[:, None]
+    pos_b = index_b.positions[ib] + vel_b * (t0 - tb0)[:, None]
+    separation = pos_b - pos_a
+    relative_velocity = vel_b - vel_a
+
+    speed_sq = np.einsum("ij,ij->i", relative_velocity, relative_velocity)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        unbounded_tau = np.nan_to_num(-np.einsum("ij,ij->i", separation, relative_velocity) / speed_sq)
+    tau = np.clip(unbounded_tau, 0.0, t1 - t0)
+
+    closest = separation + relative_velocity * tau[:, None]
+    distances = np.linalg.norm(closest, axis=1)
+
+    # Solve |separation + relative_velocity * s| = threshold for s on either
+    # side of the unconstrained minimum, then clip to the shared interval.
+    unbounded_closest = separation + relative_velocity * unbounded_tau[:, None]
+    unbounded_sq = np.einsum("ij,ij->i", unbounded_closest, unbounded_closest)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        half_width = np.sqrt(np.maximum(threshold**2 - unbounded_sq, 0.0) / speed_sq)
+    half_width = np.where(speed_sq > 0, half_width, np.inf)
+    entry = t0 + np.clip(unbounded_tau - half_width, 0.0, t1 - t0)
+    exit = t0 + np.clip(unbounded_tau + half_width, 0.0, t1 - t0)
+
+    return t0 + tau, distances, entry, exit
+
+
+def find_close_approaches(index_a: SegmentIndex, index_b: SegmentIndex, threshold: float,
+                          start_time: float = None, end_time: float = None) -> list:
+    """
+    Find every close approach within `threshold` km between two indexed trajectories.
+
+    Consecutive qualifying segments are grouped into a single encounter, and
+    each encounter is reported at its minimum distance.
+
+    Returns:
+        list: dicts with "time", "distance_km", "start_time" and "end_time"
+    """
+    ia, ib = candidate_segment_pairs(index_a, index_b, threshold, start_time, end_time)
+    if not len(ia):
+        return []
+
+    times, distances, entry, exit = refine_segment_pairs(index_a, index_b, ia, ib, threshold, start_time, end_time)
+    hit = distances <= threshold
+    if not np.any(hit):
+        return []
+
+    order = np.argsort(times[hit], kind="stable")
+    times, distances = times[hit][order], distances[hit][order]
+    entry, exit = entry[hit][order], exit[hit][order]
+
+    # A new encounter starts wherever the gap between hits exceeds the
+    # sampling interval of either trajectory.
+    spacing = max(np.max(np.diff(index_a.times)), np.max(np.diff(index_b.times)))
+    breaks = np.flatnonzero(np.diff(times) > spacing) + 1
+    approaches = []
+    for group in np.split(np.arange(len(times)), breaks):
+        closest = group[np.argmin(distances[group])]
+        approaches.append({
+            "time": float(times[closest]),
+            "distance_km": float(distances[closest]),
+            "start_time": float(entry[group].min()),
+            "end_time": float(exit[group].max()),
+        })
+    return approaches
+
+
+def find_close_approaches_between_bodies(bodies, threshold: float, start_time: float, end_time: float,
+                                         body_name: str = None, other_body: str = None) -> list:
+    """
+    Close-approach query across stored trajectories.
+
+    Args:
+        bodies: list of BodyModel
+        threshold: distance in km below which an approach is reported
+        start_time: start of the query window (in seconds from reference date)
+        end_time: end of the query window (in seconds from reference date)
+        body_name: if given, only pairs involving this body are checked
+        other_body: if given together with body_name, only this pair is checked
+
+    Returns:
+        list: encounters sorted by time of closest approach
+    """
+    indices = {}
+    for body in bodies:
+        try:
+            indices[body.name] = SegmentIndex.from_arrays(*trajectory_arrays(body), start_time, end_time)
+        except ValueError:
+            # Fewer than two points inside the window, nothing to sweep.
+            continue
+
+    names = list(indices)
+    if body_name is not None and other_body is not None:
+        pairs = [(body_name, other_body)] if body_name in indices and other_body in indices else []
+    elif body_name is not None:
+        pairs = [(body_name, name) for name in names if name != body_name and body_name in indices]
+    else:
+        pairs = [(a, b) for i, a in enumerate(names) for b in names[i + 1:]]
+
+    encounters = []
+    for a, b in pairs:
+        for approach in find_close_approaches(indices[a], indices[b], threshold, start_time, end_time):
+            approach["bodies"] = [a, b]
+            approach["date"] = seconds_to_date(approach["time"])
+            encounters.append(approach)
+
+    encounters.sort(key=lambda approach: approach["time"])
+    return encounters
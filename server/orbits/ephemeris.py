@@ -0,0 +1,192 @@
+import json
+import os
+import shutil
+import time
+import uuid
+
+import numpy as np
+
+from .trajectory_cache import trajectory_cache
+
+
+# Published versions kept on disk besides the current one, so workers that
+# have not switched yet never lose the files they have mapped.
+KEPT_VERSIONS = 2
+
+CURRENT_LINK = "current"
+
+# The memory-mapped store this process reads from: its root directory, the
+# version directory it has mapped, the body index and the mapped arrays.
+_store = {
+    "root": None,
+    "version": None,
+    "index": {},
+    "times": None,
+    "positions": None,
+}
+
+
+def trajectory_fingerprint(body) -> str:
+    """
+    Identity of a body's stored trajectory, used to tell whether a store
+    entry still matches the database without reading the JSON.
+    """
+    return f"{body.pk}:{body.trajectory_version}"
+
+
+def export_snapshot(bodies, root: str) -> str:
+    """
+    Publish every body's decoded trajectory to a memory-mappable store.
+
+    Each publish writes a new version directory holding one times.npy and
+    one positions.npy for all bodies, laid out body after body and sorted by
+    time within a body, plus an index.json with each body's offset, count
+    and fingerprint. The `current` link is then swapped to the new version
+    with an atomic rename, so readers see either the old or the new store
+    and never a partial one.
+
+    Args:
+        bodies: iterable of BodyModel
+        root: store directory
+
+    Returns:
+        str: name of the published version
+    """
+    os.makedirs(root, exist_ok=True)
+
+    index = {}
+    all_times = []
+    all_positions = []
+    offset = 0
+    for body in bodies:
+        times, positions = body.get_trajectory_arrays()
+        index[body.name] = {
+            "offset": offset,
+            "count": len(times),
+            "fingerprint": trajectory_fingerprint(body),
+        }
+        all_times.append(times)
+        all_positions.append(positions)
+        offset += len(times)
+
+    version = f"v{time.time_ns()}-{uuid.uuid4().hex[:8]}"
+    temporary_dir = os.path.join(root, f".{version}.tmp")
+    os.makedirs(temporary_dir)
+    np.save(os.path.join(temporary_dir, "times.npy"), np.concatenate(all_times) if all_times else np.empty(0))
+    np.save(os.path.join(temporary_dir, "positions.npy"), np.concatenate(all_positions) if all_positions else np.empty((0, 3)))
+    with open(os.path.join(temporary_dir, "index.json"), "w") as handle:
+        json.dump({"version": version, "bodies": index}, handle)
+    os.rename(temporary_dir, os.path.join(root, version))
+
+    temporary_link = os.path.join(root, f".{CURRENT_LINK}-{version}")
+    os.symlink(version, temporary_link)
+    os.replace(temporary_link, os.path.join(root, CURRENT_LINK))
+
+    _remove_old_versions(root, version)
+    return version
+
+
+def _remove_old_versions(root: str, current: str):
+    versions = sorted(name for name in os.listdir(root) if name.startswith("v") and name != current)
+    for name in versions[:-KEPT_VERSIONS]:
+        # Workers still mapping these files keep their pages until they remap.
+        shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+
+def load_snapshot(root: str) -> int:
+    """
+    Map the current version of a store read-only into this process.
+
+    Nothing is copied: the arrays are numpy memmaps backed by the page
+    cache, so every worker on the host shares one copy of the ephemeris.
+
+    Returns:
+        int: number of bodies in the mapped version
+    """
+    _store["root"] = root
+    _store["version"] = None
+    _refresh()
+    return len(_store["index"])
+
+
+def _refresh():
+    """Remap if another process has published a newer version."""
+    root = _store["root"]
+    if root is None:
+        return
+    try:
+        version = os.readlink(os.path.join(root, CURRENT_LINK))
+    except OSError:
+        return
+    if version == _store["version"]:
+        return
+
+    version_dir = os.path.join(root, version)
+    with open(os.path.join(version_dir, "index.json")) as handle:
+        index = json.load(handle)["bodies"]
+    _store.update({
+        "version": version,
+        "index": index,
+        "times": np.load(os.path.join(version_dir, "times.npy"), mmap_mode="r"),
+        "positions": np.load(os.path.join(version_dir, "positions.npy"), mmap_mode="r"),
+    })
+
+
+def publish_if_configured(bodies) -> str:
+    """Publish a new store version if this process reads from one."""
+    if _store["root"] is None:
+        return None
+    version = export_snapshot(bodies, _store["root"])
+    _refresh()
+    return version
+
+
+def _mapped_arrays(name: str, fingerprint: str = None):
+    _refresh()
+    entry = _store["index"].get(name)
+    if entry is None or (fingerprint is not None and entry["fingerprint"] != fingerprint):
+        return None
+    start, stop = entry["offset"], entry["offset"] + entry["count"]
+    return _store["times"][start:stop], _store["positions"][start:stop]
+
+
+def trajectory_arrays(body) -> tuple:
+    """
+    Decoded trajectory of a body as (times, positions) arrays.
+
+    Served as read-only views into the mapped store when its entry still
+    matches the stored trajectory, otherwise decoded from the database row
+    through the per-process trajectory cache. The store only holds the
+    default namespace.
+    """
+    if body.scenario_id is None:
+        mapped = _mapped_arrays(body.name, trajectory_fingerprint(body))
+        if mapped is not None:
+            return mapped
+    return trajectory_cache.arrays(body)
+
+
+def mapped_window(name: str, start_seconds: float, end_seconds: float):
+    """
+    Zero-copy slice of a body's mapped trajectory between two times.
+
+    Returns:
+        tuple: (times, positions) views into the mapped buffers, or None if
+               the body is not in the store
+    """
+    mapped = _mapped_arrays(name)
+    if mapped is None:
+        return None
+    times, positions = mapped
+    first = np.searchsorted(times, start_seconds, side="left")
+    last = np.searchsorted(times, end_seconds, side="right")
+    return times[first:last], positions[first:last]
+
+
+def snapshot_info() -> dict:
+    _refresh()
+    return {
+        "version": _store["version"],
+        "bodies": len(_store["index"]),
+        "points": 0 if _store["times"] is None else int(len(_store["times"])),
+    }
@@ -0,0 +1,196 @@
+import asyncio
+import functools
+import math
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import close_old_connections
+from fastapi import HTTPException
+
+# Threads reserved for ORM reads from the async API. Django keeps one
+# connection per thread and reuses it for CONN_MAX_AGE seconds, so this is
+# also the size of the connection pool each worker holds open.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "4"))
+
+db_executor = ThreadPoolExecutor(max_workers=DB_POOL_SIZE, thread_name_prefix="orbits-db")
+
+# Threads for light writes (scenario bookkeeping). Writes to one scenario
+# are serialized by its lock (orbits.scenarios); writes to different
+# scenarios run side by side instead of queueing on sync_to_async's single
+# thread.
+WRITE_POOL_SIZE = int(os.getenv("WRITE_POOL_SIZE", "4"))
+
+write_executor = ThreadPoolExecutor(max_workers=WRITE_POOL_SIZE, thread_name_prefix="orbits-write")
+
+# Threads for CPU-heavy work: simulations, targeting, porkchop grids and
+# conjunction searches. At most COMPUTE_POOL_SIZE run at once and
+# COMPUTE_QUEUE_SIZE more wait for a thread; anything beyond that is turned
+# away with 429 rather than piling up behind them. Reads never use this
+# pool, so they keep their own lane on db_executor.
+COMPUTE_POOL_SIZE = int(os.getenv("COMPUTE_POOL_SIZE", str(os.cpu_count() or 1)))
+COMPUTE_QUEUE_SIZE = int(os.getenv("COMPUTE_QUEUE_SIZE", "8"))
+
+compute_executor = ThreadPoolExecutor(max_workers=COMPUTE_POOL_SIZE, thread_name_prefix="orbits-compute")
+
+
+class ComputeOverloaded(HTTPException):
+    """Every compute slot and queue place is taken; the client should retry after `retry_after` seconds."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(
+            status_code=429,
+            detail="Too many simulations in progress, retry later",
+            headers={"Retry-After": str(retry_after)}
+        )
+        self.retry_after = retry_after
+
+
+class ComputeAdmission:
+    """
+    Admission control for the compute pool.
+
+    Up to `budget` jobs run at once and up to `queue_size` more wait their
+    turn; further requests are rejected with ComputeOverloaded, whose
+    Retry-After is estimated from the recent job duration and the queue
+    ahead.
+    """
+
+    def __init__(self, budget: int, queue_size: int):
+        self.budget = budget
+        self.queue_size = queue_size
+        self.in_flight = 0
+        self.average_seconds = None
+        self.stats = {"admitted": 0, "queued": 0, "rejected": 0}
+        self._waiters = deque()
+
+    def retry_after(self) -> int:
+        average = self.average_seconds or 1.0
+        return max(math.ceil(average * (len(self._waiters) + 1) / self.budget), 1)
+
+    async def acquire(self):
+        """
+        Take a compute slot, waiting in the queue if every slot is busy.
+
+        The caller must call release() once the job has finished running,
+        whether or not anyone is still waiting for its result.
+
+        Raises:
+            ComputeOverloaded: if every slot and queue place is taken
+        """
+        if self.in_flight + len(self._waiters) >= self.budget + self.queue_size:
+            self.stats["rejected"] += 1
+            raise ComputeOverloaded(self.retry_after())
+        if self.in_flight < self.budget:
+            self.in_flight += 1
+        else:
+            # Wait for a finishing job to hand its slot over.
+            self.stats["queued"] += 1
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    self._release()
+                else:
+                    self._waiters.remove(waiter)
+                raise
+        self.stats["admitted"] += 1
+
+    def release(self, elapsed: float = None):
+        """Give a slot back; `elapsed` is how long the job ran, for Retry-After."""
+        self._release()
+        if elapsed is not None:
+            # Exponential moving average of job duration for Retry-After.
+            self.average_seconds = elapsed if self.average_seconds is None else 0.8 * self.average_seconds + 0.2 * elapsed
+
+    def _release(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def status(self) -> dict:
+        return {
+            "budget": self.budget,
+            "queue_size": self.queue_size,
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "average_seconds": self.average_seconds,
+            **self.stats,
+        }
+
+
+compute_admission = ComputeAdmission(COMPUTE_POOL_SIZE, COMPUTE_QUEUE_SIZE)
+
+
+def _call_with_connection(func, args, kwargs):
+    # Outside Django's request cycle nothing expires connections, so do it
+    # around every call: connections past CONN_MAX_AGE or left unusable are
+    # closed and reopened, healthy ones are reused.
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_db(func, *args, **kwargs):
+    """
+    Run a blocking ORM call on the database pool.
+
+    Unlike sync_to_async, which funnels every call through one thread,
+    independent reads run concurrently on pooled connections, e.g. with
+    asyncio.gather.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(db_executor, functools.partial(_call_with_connection, func, args, kwargs))
+
+
+async def run_write(func, *args, **kwargs):
+    """Run a blocking light write on the write pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(write_executor, functools.partial(_call_with_connection, func, args, kwargs))
+
+
+async def run_compute(func, *args, **kwargs):
+    """
+    Run CPU-heavy work on the compute pool once admitted.
+
+    The slot is held until the job itself finishes, not until the caller
+    stops waiting: a cancelled request (a client disconnect) leaves its
+    thread running, and that thread still counts against the budget.
+
+    Raises:
+        ComputeOverloaded: if the compute budget and queue are full
+    """
+    await compute_admission.acquire()
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+
+    def finished(_):
+        # Runs on the worker thread, or here if the job never started.
+        try:
+            loop.call_soon_threadsafe(compute_admission.release, time.perf_counter() - started)
+        except RuntimeError:
+            pass  # The loop is closed; nobody is left to admit.
+
+    try:
+        job = compute_executor.submit(_call_with_connection, func, args, kwargs)
+    except BaseException:
+        compute_admission.release()
+        raise
+    job.add_done_callback(finished)
+    return await asyncio.wrap_future(job)
+
+
+def db_reader(func):
+    """Decorator turning a blocking ORM read into a coroutine that runs on the database pool."""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await run_db(func, *args, **kwargs)
+    return wrapper
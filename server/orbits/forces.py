@@ -0,0 +1,71 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# Bodies per tile side. A tile's temporaries are a handful of
+# FORCE_TILE_SIZE x FORCE_TILE_SIZE float64 arrays (128 KiB each at 128),
+# sized to stay in cache; memory stays bounded by threads x tile, not N^2.
+FORCE_TILE_SIZE = int(os.getenv("FORCE_TILE_SIZE", "128"))
+
+# Threads evaluating target blocks in parallel. NumPy releases the GIL in
+# the elementwise and reduction loops that make up a tile.
+FORCE_THREADS = int(os.getenv("FORCE_THREADS", str(os.cpu_count() or 1)))
+
+force_executor = ThreadPoolExecutor(max_workers=FORCE_THREADS, thread_name_prefix="orbits-forces")
+
+
+def _accumulate_block(columns, masses, G: float, start: int, stop: int, tile: int, out: np.ndarray):
+    """
+    Accelerations of targets start:stop from every source, one source tile at a time.
+
+    Coordinates are passed as a (3, n) array so each axis is contiguous.
+    Pairs at zero distance (a body and itself) contribute nothing.
+    """
+    n = columns.shape[1]
+    targets = columns[:, start:stop, None]
+    acc = np.zeros((3, stop - start))
+
+    for source_start in range(0, n, tile):
+        source_stop = min(source_start + tile, n)
+        separation = columns[:, None, source_start:source_stop] - targets  # (3, t, s)
+        distance_sq = separation[0]**2 + separation[1]**2 + separation[2]**2
+        weights = np.zeros_like(distance_sq)
+        np.divide(masses[source_start:source_stop], distance_sq * np.sqrt(distance_sq), out=weights, where=distance_sq > 0)
+        acc += (separation * weights).sum(axis=-1)
+
+    out[start:stop] = G * acc.T
+
+
+def tiled_accelerations(positions, masses, G: float, tile: int = FORCE_TILE_SIZE, executor=force_executor) -> np.ndarray:
+    """
+    Pairwise gravitational accelerations with bounded memory.
+
+    Targets are split into blocks of `tile` bodies and each block sums over
+    sources `tile` at a time, so no N x N x 3 array is ever built. Blocks
+    write disjoint rows of the result and run on `executor` when there is
+    more than one.
+
+    Args:
+        positions: positions in km, shape (n, 3)
+        masses: masses in kg, shape (n,)
+        G: gravitational constant in km^3/(kg·s^2)
+        tile: bodies per tile side
+        executor: thread pool for the blocks; None evaluates them in turn
+
+    Returns:
+        np.ndarray: accelerations in km/s^2, shape (n, 3)
+    """
+    columns = np.ascontiguousarray(np.asarray(positions, dtype=float).T)
+    masses = np.asarray(masses, dtype=float)
+    n = columns.shape[1]
+    out = np.empty((n, 3))
+
+    blocks = [(start, min(start + tile, n)) for start in range(0, n, tile)]
+    if executor is None or len(blocks) == 1:
+        for start, stop in blocks:
+            _accumulate_block(columns, masses, G, start, stop, tile, out)
+    else:
+        # list() re-raises any error from a block.
+        list(executor.map(lambda block: _accumulate_block(columns, masses, G, block[0], block[1], tile, out), blocks))
+    return out
@@ -0,0 +1,182 @@
+import numpy as np
+
+from .twobody import propagate_kepler, solve_lambert
+
+# Stored samples used to validate the analytic fit against the N-body solution.
+VALIDATION_SPAN = 30 * 24 * 60 * 60  # seconds
+
+
+def epoch_state(times: np.ndarray, positions: np.ndarray, mu: float, at_end: bool = True, state: tuple = None) -> tuple:
+    """
+    State at one end of a stored trajectory, relative to the central body.
+
+    The stored trajectory only holds positions. If `state` (the position and
+    velocity kept on the BodyModel) matches the sample at that end it is used
+    as is; otherwise the velocity is recovered exactly for two-body motion by
+    solving Lambert's problem between the two end samples.
+
+    Args:
+        times: sorted sample times in seconds, shape (n,)
+        positions: sample positions relative to the central body, shape (n, 3)
+        mu: gravitational parameter of the central body in km^3/s^2
+        at_end: take the last sample (True) or the first one (False)
+        state: optional (position, velocity) relative to the central body
+
+    Returns:
+        tuple: (epoch time, position, velocity)
+    """
+    index = -1 if at_end else 0
+    position = positions[index]
+    if state is not None and np.allclose(state[0], position, rtol=1e-12, atol=1e-6):
+        return float(times[index]), position, np.asarray(state[1], dtype=float)
+
+    first, second = (-2, -1) if at_end else (0, 1)
+    # Nearby samples are always joined by the short-way transfer, so the
+    # sense of motion about +z picks the prograde or retrograde solution.
+    prograde = np.cross(positions[first], positions[second])[2] >= 0
+    v_first, v_second = solve_lambert(positions[first], positions[second], times[second] - times[first], mu, prograde=prograde)
+    velocity = v_second if at_end else v_first
+    return float(times[index]), position, velocity
+
+
+def kepler_error_scale(times: np.ndarray, positions: np.ndarray, epoch: tuple, mu: float) -> tuple:
+    """
+    Measure how far the analytic orbit drifts from the stored N-body solution.
+
+    The orbit through `epoch` is propagated over up to VALIDATION_SPAN of
+    stored samples next to the epoch and compared point by point.
+
+    Returns:
+        tuple: (largest deviation in km, span it was measured over in seconds)
+    """
+    epoch_time, position, velocity = epoch
+    nearby = np.abs(times - epoch_time) <= VALIDATION_SPAN
+    span = float(np.max(np.abs(times[nearby] - epoch_time)))
+    if span == 0:
+        return 0.0, 0.0
+    predicted, _ = propagate_kepler(position[None, :], velocity[None, :], mu, times[nearby] - epoch_time)
+    return float(np.max(np.linalg.norm(predicted[0] - positions[nearby], axis=-1))), span
+
+
+def kepler_error_bound(deviation: float, span: float, offsets) -> np.ndarray:
+    """
+    Documented error bound of the Kepler fast path relative to the N-body solution.
+
+    The analytic orbit ignores every body except the central one. Over a
+    short span the neglected perturbations act like a roughly constant
+    acceleration, so the position error grows at most quadratically with
+    time from the epoch. The bound therefore takes the worst deviation
+    measured over the validation span and scales it linearly inside the
+    span and quadratically beyond it:
+
+        bound(dt) = deviation * max(|dt| / span, (|dt| / span)^2)
+
+    It is an empirical estimate, not a guarantee, and is meaningful only for
+    near-Keplerian bodies (planets about the Sun); close encounters and
+    burns are not represented.
+
+    Args:
+        deviation: largest deviation over the validation span in km
+        span: validation span in seconds
+        offsets: time offsets from the epoch in seconds
+
+    Returns:
+        np.ndarray: error bound in km for each offset
+    """
+    offsets = np.abs(np.asarray(offsets, dtype=float))
+    if span <= 0:
+        return np.full(offsets.shape, np.inf)
+    ratio = offsets / span
+    return deviation * np.maximum(ratio, ratio**2)
+
+
+def extrapolate_positions(times: np.ndarray, positions: np.ndarray, query_times, mu: float,
+                          center=np.zeros(3), state: tuple = None) -> tuple:
+    """
+    Kepler positions for query times outside a stored trajectory.
+
+    Times after the last sample are propagated from the end of the
+    trajectory and times before the first sample from its start. The
+    central body is taken to be fixed at `center`, as the Sun is in the
+    simulation.
+
+    Args:
+        times: sorted sample times in seconds, shape (n,)
+        positions: sample positions in km, shape (n, 3)
+        query_times: times to evaluate at, all outside [times[0], times[-1]]
+        mu: gravitational parameter of the central body in km^3/s^2
+        center: position of the central body
+        state: optional (position, velocity) of the body at the end of the trajectory
+
+    Returns:
+        tuple: (positions of shape (m, 3), error bound in km of shape (m,))
+    """
+    query_times = np.asarray(query_times, dtype=float)
+    relative = positions - center
+    result = np.empty((len(query_times), 3))
+    bound = np.empty(len(query_times))
+
+    for at_end, mask in ((True, query_times > times[-1]), (False, query_times < times[0])):
+        if not np.any(mask):
+            continue
+        end_state = None
+        if at_end and state is not None:
+            end_state = (np.asarray(state[0]) - center, state[1])
+        epoch = epoch_state(times, relative, mu, at_end=at_end, state=end_state)
+        offsets = query_times[mask] - epoch[0]
+        predicted, _ = propagate_kepler(epoch[1][None, :], epoch[2][None, :], mu, offsets)
+        result[mask] = predicted[0] + center
+        bound[mask] = kepler_error_bound(*kepler_error_scale(times, relative, epoch, mu), offsets)
+
+    return result, bound
+
+
+def fill_outside_coverage(times: np.ndarray, positions: np.ndarray, start_time: float, end_time: float,
+                          cadence: float, mu: float, center=np.zeros(3), state: tuple = None) -> tuple:
+    """
+    Kepler samples covering the parts of [start_time, end_time] that the
+    stored trajectory does not, spaced `cadence` seconds apart.
+
+    Returns:
+        tuple: (trajectory dict keyed like stored trajectories, largest error bound in km)
+    """
+    if len(times) < 2:
+        raise ValueError("At least two trajectory points are needed to extrapolate")
+
+    before = np.arange(start_time, min(end_time + cadence, times[0]), cadence)
+    before = before[(before < times[0]) & (before <= end_time)]
+    after = times[-1] + cadence * np.arange(1, max(int(np.floor((end_time - times[-1]) / cadence)), 0) + 1)
+    after = after[after >= start_time]
+    query_times = np.concatenate([before, after])
+    if not len(query_times):
+        return {}, 0.0
+
+    predicted, bound = extrapolate_positions(times, positions, query_times, mu, center=center, state=state)
+    # Samples whose Kepler solve did not converge are left out rather than sent as NaN.
+    solved = np.all(np.isfinite(predicted), axis=1)
+    if not np.any(solved):
+        return {}, 0.0
+    trajectory = {f"{float(t)}": position.tolist() for t, position in zip(query_times[solved], predicted[solved])}
+    return trajectory, float(bound[solved].max())
+
+
+def preview_positions(epochs: list, query_times, mu: float, center=np.zeros(3)) -> np.ndarray:
+    """
+    Evaluate many bodies at many times with a single Kepler call.
+
+    Args:
+        epochs: list of (epoch time, position, velocity) relative to the central body
+        query_times: times to evaluate at in seconds, shape (m,)
+        mu: gravitational parameter of the central body in km^3/s^2
+        center: position of the central body
+
+    Returns:
+        np.ndarray: positions of shape (n, m, 3); NaN where the Kepler solve
+                    did not converge
+    """
+    query_times = np.asarray(query_times, dtype=float)
+    epoch_times = np.array([epoch[0] for epoch in epochs], dtype=float)
+    r0 = np.array([epoch[1] for epoch in epochs], dtype=float).reshape(-1, 3)
+    v0 = np.array([epoch[2] for epoch in epochs], dtype=float).reshape(-1, 3)
+    positions, _ = propagate_kepler(r0, v0, mu, query_times[None, :] - epoch_times[:, None])
+    return positions + center
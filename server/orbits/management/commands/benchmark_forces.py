@@ -0,0 +1,42 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from orbits.forces import FORCE_TILE_SIZE, tiled_accelerations
+from orbits.simulation import G
+
+
+class Command(BaseCommand):
+    help = "Time the tiled force kernel across body counts and thread counts."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 20000], help="Body counts to time")
+        parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8], help="Thread counts to time")
+        parser.add_argument("--tile", type=int, default=FORCE_TILE_SIZE, help="Bodies per tile side")
+        parser.add_argument("--repeat", type=int, default=3, help="Evaluations per measurement; the best is reported")
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(0)
+        tile = options["tile"]
+        # Temporaries of one tile: separation (3 arrays), squared distance,
+        # weights and the product, all float64.
+        tile_bytes = 6 * tile * tile * 8
+
+        self.stdout.write(f"{'bodies':>8} {'threads':>8} {'seconds':>10} {'pairs/s':>12} {'speedup':>8} {'tile MiB':>9}")
+        for n in options["sizes"]:
+            positions = rng.normal(scale=1.5e8, size=(n, 3))
+            masses = rng.uniform(1e15, 1e25, size=n)
+            baseline = None
+            for threads in options["threads"]:
+                with ThreadPoolExecutor(max_workers=threads) as executor:
+                    tiled_accelerations(positions, masses, G, tile, executor)  # warm up
+                    best = float("inf")
+                    for _ in range(options["repeat"]):
+                        started = time.perf_counter()
+                        tiled_accelerations(positions, masses, G, tile, executor)
+                        best = min(best, time.perf_counter() - started)
+                baseline = baseline or best
+                memory = min(threads, -(-n // tile)) * tile_bytes / 2**20
+                self.stdout.write(f"{n:>8} {threads:>8} {best:>10.4f} {n * n / best:>12.3e} {baseline / best:>8.2f} {memory:>9.1f}")
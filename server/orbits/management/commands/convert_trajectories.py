@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from orbits.models import BodyModel
+
+
+class Command(BaseCommand):
+    help = "Rewrite every stored trajectory in the format selected by TRAJECTORY_STORAGE (json or codec)."
+
+    def handle(self, *args, **options):
+        for body in BodyModel.objects.all():
+            before = len(body.trajectory_json or "") + len(body.trajectory_blob or b"")
+            body.set_trajectory(body.get_trajectory())
+            body.save()
+            after = len(body.trajectory_json or "") + len(body.trajectory_blob or b"")
+            self.stdout.write(f"{body.name}: {before} -> {after} bytes")
+        self.stdout.write(self.style.SUCCESS(f"Stored trajectories as {settings.TRAJECTORY_STORAGE}"))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from orbits.ephemeris import export_snapshot
+from orbits.models import BodyModel
+
+
+class Command(BaseCommand):
+    help = "Publish every body's decoded trajectory to the memory-mapped ephemeris store that API workers map at boot (EPHEMERIS_SNAPSHOT)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Store directory; a new version is published and swapped in")
+
+    def handle(self, *args, **options):
+        version = export_snapshot(BodyModel.objects.filter(scenario__isnull=True), options["path"])
+        self.stdout.write(self.style.SUCCESS(f"Published {version} to {options['path']}"))
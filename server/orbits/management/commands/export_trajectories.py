@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from orbits.models import Scenario
+from orbits.scenarios import get_scenario, scenario_bodies
+from orbits.tables import export_dataset, stream_export
+
+
+class Command(BaseCommand):
+    help = "Export trajectories, derived velocities and body metadata for offline analysis: a Parquet dataset partitioned by body and quarter, or a single Arrow IPC stream / Parquet file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Dataset directory, or output file with --format arrow/parquet-file")
+        parser.add_argument("--format", choices=["dataset", "arrow", "parquet-file"], default="dataset")
+        parser.add_argument("--scenario", default=None, help="Scenario to export (default namespace if omitted)")
+
+    def handle(self, *args, **options):
+        try:
+            bodies = scenario_bodies(get_scenario(options["scenario"]))
+        except Scenario.DoesNotExist:
+            raise CommandError(f"Scenario {options['scenario']} not found")
+
+        try:
+            if options["format"] == "dataset":
+                rows = export_dataset(bodies, options["path"])
+                self.stdout.write(self.style.SUCCESS(f"Wrote {rows} rows for {len(bodies)} bodies to {options['path']}"))
+                return
+            output_format = "arrow" if options["format"] == "arrow" else "parquet"
+            size = 0
+            with open(options["path"], "wb") as f:
+                for chunk in stream_export(bodies, output_format):
+                    f.write(chunk)
+                    size += len(chunk)
+        except RuntimeError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"Wrote {size} bytes for {len(bodies)} bodies to {options['path']}"))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from orbits.scenarios import get_scenario, scenario_write_lock
+from orbits.tables import import_bodies
+
+
+class Command(BaseCommand):
+    help = "Seed a scenario from an export_trajectories dataset or an /export_trajectories/ file in one bulk insert."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Dataset directory, Arrow IPC stream or Parquet file")
+        parser.add_argument("--scenario", default=None, help="Scenario to create the bodies in, created if missing (default namespace if omitted)")
+        parser.add_argument("--replace", action="store_true", help="Replace bodies of the same names instead of failing")
+
+    def handle(self, *args, **options):
+        scenario = get_scenario(options["scenario"], create=True)
+        try:
+            with scenario_write_lock(scenario), transaction.atomic():
+                bodies = import_bodies(options["path"], scenario, replace=options["replace"])
+        except (ValueError, RuntimeError) as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"Imported {', '.join(body.name for body in bodies)}"))
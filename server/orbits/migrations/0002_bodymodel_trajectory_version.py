@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orbits', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bodymodel',
+            name='trajectory_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='bodymodel',
+            name='trajectory_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orbits', '0002_bodymodel_trajectory_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bodymodel',
+            name='trajectory_blob',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
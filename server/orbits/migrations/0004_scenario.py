@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orbits', '0003_bodymodel_trajectory_blob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bodymodel',
+            name='base_time',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='bodymodel',
+            name='name',
+            field=models.CharField(max_length=100),
+        ),
+        migrations.CreateModel(
+            name='Scenario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('is_fork', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('parent', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='forks', to='orbits.scenario')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='bodymodel',
+            name='scenario',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='bodies', to='orbits.scenario'),
+        ),
+        migrations.AddConstraint(
+            model_name='bodymodel',
+            constraint=models.UniqueConstraint(fields=('scenario', 'name'), name='unique_body_name_per_scenario'),
+        ),
+        migrations.AddConstraint(
+            model_name='bodymodel',
+            constraint=models.UniqueConstraint(condition=models.Q(('scenario__isnull', True)), fields=('name',), name='unique_body_name_in_default_scenario'),
+        ),
+    ]
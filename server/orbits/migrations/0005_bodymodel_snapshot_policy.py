@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orbits', '0004_scenario'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bodymodel',
+            name='snapshot_policy',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
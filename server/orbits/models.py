@@ -1,7 +1,85 @@
 import numpy as np
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 import json
 
+from .codec import DEFAULT_PRECISION, decode_trajectory, encode_trajectory
+from .trajectory_cache import trajectory_cache
+from .utils import trajectory_to_arrays
+
+class Scenario(models.Model):
+    """
+    Namespace for an independent set of bodies and trajectories.
+
+    Bodies without a scenario form the default namespace. A fork inherits
+    every body of its parent (the default namespace when parent is null)
+    until it writes to them; see resolve_bodies and BodyModel.base_time.
+    """
+
+    name = models.CharField(max_length=100, unique=True)
+    parent = models.ForeignKey("self", null=True, blank=True, on_delete=models.PROTECT, related_name="forks")
+    is_fork = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
+
+    def lineage(self) -> list:
+        """This scenario followed by every namespace it inherits from; None is the default namespace."""
+        chain = [self]
+        scenario = self
+        while scenario.is_fork:
+            scenario = scenario.parent
+            chain.append(scenario)
+            if scenario is None:
+                break
+        return chain
+
+
+def namespace_filter(scenarios: list) -> models.Q:
+    """Q matching bodies in any of the given namespaces (None is the default one)."""
+    q = models.Q(scenario__in=[scenario for scenario in scenarios if scenario is not None])
+    if None in scenarios:
+        q |= models.Q(scenario__isnull=True)
+    return q
+
+
+def lineage_of(scenario) -> list:
+    return [None] if scenario is None else scenario.lineage()
+
+
+def resolve_bodies(scenario, names=None) -> dict:
+    """
+    Bodies visible in a scenario, keyed by name.
+
+    A body the scenario owns hides the one of the same name it inherits, so
+    a fork sees its own copies of the bodies it has written to and its
+    parent's rows for the rest. One query covers the whole lineage.
+    """
+    lineage = lineage_of(scenario)
+    depth = {getattr(namespace, "pk", None): level for level, namespace in enumerate(lineage)}
+    bodies = BodyModel.objects.filter(namespace_filter(lineage)).order_by("pk")
+    if names is not None:
+        bodies = bodies.filter(name__in=names)
+
+    # Rows of the same name ordered from the scenario itself down the
+    # lineage; names keep the order of the baseline.
+    rows_by_name = {}
+    for body in bodies:
+        rows_by_name.setdefault(body.name, []).append(body)
+
+    resolved = {}
+    for name, rows in rows_by_name.items():
+        rows.sort(key=lambda row: depth[row.scenario_id])
+        # Each row inherits from the next one down, so fork copies can
+        # compose their trajectories without further queries.
+        for row, base in zip(rows, rows[1:] + [None]):
+            row._base_body = base
+        resolved[name] = rows[0]
+    return resolved
+
+
 class BodyModel(models.Model):
     """
     Stores a celestial body's data in the database.
@@ -9,7 +87,8 @@ class BodyModel(models.Model):
     rather than a single array field.
     """
 
-    name = models.CharField(max_length=100, unique=True)
+    scenario = models.ForeignKey(Scenario, null=True, blank=True, on_delete=models.CASCADE, related_name="bodies")
+    name = models.CharField(max_length=100)
     mass = models.FloatField()
 
     # Position in km
@@ -23,6 +102,29 @@ class BodyModel(models.Model):
     velocity_z = models.FloatField()
 
     trajectory_json = models.TextField(null=True, blank=True)
+    # Used instead of trajectory_json when TRAJECTORY_STORAGE is "codec"
+    # (see orbits.codec).
+    trajectory_blob = models.BinaryField(null=True, blank=True)
+
+    # Bumped on every trajectory write; drives ETag/Last-Modified and lets
+    # caches tell whether a decoded trajectory is still current.
+    trajectory_version = models.PositiveIntegerField(default=0)
+    trajectory_updated_at = models.DateTimeField(null=True, blank=True)
+
+    # Set on a fork's copy of an inherited body: the copy stores only samples
+    # from base_time on and reads earlier ones, and the one at base_time
+    # unless it has its own, from the body it inherits.
+    base_time = models.FloatField(null=True, blank=True)
+
+    # How the simulation samples this body's trajectory (see orbits.snapshots);
+    # null uses settings.SNAPSHOT_POLICY.
+    snapshot_policy = models.JSONField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["scenario", "name"], name="unique_body_name_per_scenario"),
+            models.UniqueConstraint(fields=["name"], condition=models.Q(scenario__isnull=True), name="unique_body_name_in_default_scenario"),
+        ]
 
     def __str__(self):
         return f"{self.name} (mass={self.mass})"
@@ -52,11 +154,84 @@ class BodyModel(models.Model):
 
     def set_trajectory(self, trajectory_dict: dict):
         """
-        Example if you want to store the entire time-snapshots in JSON form.
+        Store the entire time-snapshots, as JSON or, when TRAJECTORY_STORAGE
+        is "codec", as a quantized compressed blob.
         """
-        self.trajectory_json = json.dumps(trajectory_dict)
+        if self.base_time is not None:
+            trajectory_dict = {t: p for t, p in trajectory_dict.items() if float(t) >= self.base_time}
+        if getattr(settings, "TRAJECTORY_STORAGE", "json") == "codec":
+            self.trajectory_blob = encode_trajectory(
+                *trajectory_to_arrays(trajectory_dict),
+                precision=getattr(settings, "TRAJECTORY_PRECISION", DEFAULT_PRECISION)
+            )
+            self.trajectory_json = None
+        else:
+            self.trajectory_json = json.dumps(trajectory_dict)
+            self.trajectory_blob = None
+        self.trajectory_version += 1
+        self.trajectory_updated_at = timezone.now()
+        if self.pk is not None:
+            trajectory_cache.invalidate(self.pk)
+
+    def set_trajectory_arrays(self, times, positions):
+        """set_trajectory from time-sorted (times, positions) arrays; the codec encodes them without building a dict."""
+        times = np.asarray(times, dtype=float)
+        positions = np.asarray(positions, dtype=float).reshape(-1, 3)
+        if getattr(settings, "TRAJECTORY_STORAGE", "json") != "codec":
+            self.set_trajectory({f"{t}": position for t, position in zip(times.tolist(), positions.tolist())})
+            return
+        if self.base_time is not None:
+            keep = times >= self.base_time
+            times, positions = times[keep], positions[keep]
+        self.trajectory_blob = encode_trajectory(
+            times,
+            positions,
+            precision=getattr(settings, "TRAJECTORY_PRECISION", DEFAULT_PRECISION)
+        )
+        self.trajectory_json = None
+        self.trajectory_version += 1
+        self.trajectory_updated_at = timezone.now()
+        if self.pk is not None:
+            trajectory_cache.invalidate(self.pk)
 
     def get_trajectory(self) -> dict:
+        trajectory = self._own_trajectory()
+        base = self.base_body()
+        if base is None:
+            return trajectory
+        inherited = {t: p for t, p in base.get_trajectory().items() if float(t) <= self.base_time}
+        inherited.update(trajectory)
+        return inherited
+
+    def _own_trajectory(self) -> dict:
+        if self.trajectory_blob:
+            times, positions = decode_trajectory(self.trajectory_blob)
+            return {f"{t}": position for t, position in zip(times.tolist(), positions.tolist())}
         if not self.trajectory_json:
             return {}
         return json.loads(self.trajectory_json)
+
+    def get_trajectory_arrays(self) -> tuple:
+        """Time-sorted (times, positions) arrays, decoded without building the dict when stored as a blob."""
+        if self.trajectory_blob:
+            times, positions = decode_trajectory(self.trajectory_blob)
+        else:
+            times, positions = trajectory_to_arrays(self._own_trajectory())
+        base = self.base_body()
+        if base is None:
+            return times, positions
+        base_times, base_positions = base.get_trajectory_arrays()
+        # Samples up to base_time are inherited; the copy's own sample at
+        # base_time, if it has one, takes precedence.
+        own_start = times[0] if len(times) else np.inf
+        inherited = (base_times <= self.base_time) & (base_times < own_start)
+        return np.concatenate([base_times[inherited], times]), np.concatenate([base_positions[inherited], positions])
+
+    def base_body(self):
+        """The body this fork copy inherits its early trajectory from, or None."""
+        if self.base_time is None or self.scenario_id is None:
+            return None
+        if not hasattr(self, "_base_body"):
+            parent = self.scenario.parent if self.scenario.is_fork else None
+            self._base_body = resolve_bodies(parent, [self.name]).get(self.name)
+        return self._base_body
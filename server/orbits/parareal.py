@@ -0,0 +1,219 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .forces import tiled_accelerations
+from .snapshots import policy_from_spec
+
+# Processes running fine segments in parallel; defaults to one per core.
+PARAREAL_WORKERS = int(os.getenv("PARAREAL_WORKERS", str(os.cpu_count() or 1)))
+
+# Coarse propagator step. An hour resolves the Moon's month well enough for
+# the coarse predictions to need only a few corrections.
+PARAREAL_COARSE_STEP = 3600.0  # seconds
+
+# Parareal stops once no segment boundary moves more than this between
+# iterations.
+PARAREAL_TOLERANCE_KM = 1.0
+
+
+def accelerations(positions: np.ndarray, masses: np.ndarray, fixed: np.ndarray, G: float) -> np.ndarray:
+    """Pairwise gravitational accelerations, shape (n, 3); fixed bodies get none."""
+    # Tiles are evaluated in turn: the pool processes already use every core,
+    # and a forked copy of the parent's thread pool has no threads behind it.
+    acc = tiled_accelerations(positions, masses, G, executor=None)
+    acc[fixed] = 0.0
+    return acc
+
+
+def verlet(positions, velocities, masses, fixed, G: float, dt: float, steps: int,
+           start_time: float = 0.0, policies: list = None):
+    """
+    Velocity Verlet over arrays, the same scheme as nbody_simulation_verlet.
+
+    Args:
+        positions: initial positions in km, shape (n, 3)
+        velocities: initial velocities in km/s, shape (n, 3)
+        masses: masses in kg, shape (n,)
+        fixed: boolean mask of bodies held in place (the Sun), shape (n,)
+        G: gravitational constant in km^3/(kg·s^2)
+        dt: time step in seconds
+        steps: number of steps
+        start_time: time of the initial state (in seconds from reference date)
+        policies: if given, one snapshot policy per body deciding which
+            positions to record (see orbits.snapshots)
+
+    Returns:
+        tuple: (positions, velocities) at the end, and when recording a list
+               of {time key: position} per body (the start is not included)
+    """
+    x = np.array(positions, dtype=float)
+    v = np.array(velocities, dtype=float)
+    v[fixed] = 0.0
+    a = accelerations(x, masses, fixed, G)
+
+    samples = None
+    if policies is not None:
+        samples = [{} for _ in policies]
+        for policy in policies:
+            policy.reset(start_time, dt)
+
+    for step in range(1, steps + 1):
+        x = x + v * dt + 0.5 * a * dt**2
+        new_a = accelerations(x, masses, fixed, G)
+        v = v + 0.5 * (a + new_a) * dt
+        a = new_a
+        if samples is not None:
+            current_time = start_time + step * dt
+            for i, policy in enumerate(policies):
+                if policy.should_record(step, current_time, a[i]) or step == steps:
+                    samples[i][f"{current_time}"] = x[i].tolist()
+                    policy.recorded(current_time)
+
+    return x, v, samples
+
+
+def coarse_propagate(positions, velocities, masses, fixed, G: float, duration: float,
+                     coarse_step: float = PARAREAL_COARSE_STEP):
+    """Cheap prediction of the state `duration` seconds on: Verlet with a large step."""
+    steps = max(int(np.ceil(duration / coarse_step)), 1)
+    x, v, _ = verlet(positions, velocities, masses, fixed, G, duration / steps, steps)
+    return x, v
+
+
+def _fine_segment(args):
+    # Runs in a pool process: only arrays and policy specs cross over.
+    positions, velocities, masses, fixed, G, dt, steps, start_time, specs, snapshot_interval = args
+    started = time.perf_counter()
+    policies = [policy_from_spec(spec, snapshot_interval) for spec in specs]
+    x, v, samples = verlet(positions, velocities, masses, fixed, G, dt, steps, start_time, policies)
+    return x, v, samples, time.perf_counter() - started
+
+
+def parareal(positions, velocities, masses, fixed, G: float, start_time: float, segments: int,
+             dt: float, steps_per_segment: int, specs: list, snapshot_interval: int,
+             coarse_step: float = PARAREAL_COARSE_STEP, tolerance_km: float = PARAREAL_TOLERANCE_KM,
+             max_iterations: int = None, workers: int = PARAREAL_WORKERS) -> tuple:
+    """
+    Parallel-in-time propagation of consecutive segments (e.g. quarters).
+
+    The coarse propagator predicts every segment's starting state in
+    sequence; the fine Verlet segments then run from those states in
+    parallel across a process pool, and the predictor-corrector update
+    U[j+1] = G(U_new[j]) + F(U[j]) - G(U[j]) folds their results back in.
+    Iterations repeat until no boundary moves more than `tolerance_km`.
+    After k iterations the first k segments are exact, so it never takes
+    more than `segments` iterations, and only segments whose start moved by
+    more than the tolerance are re-run.
+
+    Args:
+        positions, velocities, masses, fixed: initial state as in verlet
+        G: gravitational constant in km^3/(kg·s^2)
+        start_time: start of the first segment (in seconds from reference date)
+        segments: number of segments
+        dt: fine time step in seconds
+        steps_per_segment: fine steps per segment
+        specs: snapshot policy spec per body, already resolved (no None)
+        snapshot_interval: default fixed cadence for the policies
+        coarse_step: coarse propagator step in seconds
+        tolerance_km: convergence threshold on boundary positions
+        max_iterations: cap on corrections (default: `segments`)
+        workers: pool size
+
+    Returns:
+        tuple: (samples per body as {time key: position}, final positions,
+                final velocities, convergence report)
+    """
+    masses = np.asarray(masses, dtype=float)
+    fixed = np.asarray(fixed, dtype=bool)
+    duration = dt * steps_per_segment
+    max_iterations = segments if max_iterations is None else min(max_iterations, segments)
+    started = time.perf_counter()
+
+    def coarse(state):
+        return coarse_propagate(state[0], state[1], masses, fixed, G, duration, coarse_step)
+
+    # Iteration 0: coarse predictions of every boundary, in sequence.
+    boundaries = [(np.asarray(positions, dtype=float), np.asarray(velocities, dtype=float))]
+    coarse_results = []
+    for _ in range(segments):
+        coarse_results.append(coarse(boundaries[-1]))
+        boundaries.append(coarse_results[-1])
+
+    report = {
+        "segments": segments,
+        "workers": workers,
+        "tolerance_km": tolerance_km,
+        "converged": False,
+        "iterations": [],
+    }
+
+    fine_results = [None] * segments
+    fine_samples = [None] * segments
+    fine_starts = [None] * segments
+    stale = set(range(segments))
+    segment_seconds = []
+
+    with ProcessPoolExecutor(max_workers=max(min(workers, segments), 1)) as pool:
+        for iteration in range(1, max_iterations + 1):
+            iteration_started = time.perf_counter()
+            rerun = sorted(stale)
+            jobs = [
+                (boundaries[j][0], boundaries[j][1], masses, fixed, G, dt, steps_per_segment,
+                 start_time + j * duration, specs, snapshot_interval)
+                for j in rerun
+            ]
+            for j, (x, v, samples, seconds) in zip(rerun, pool.map(_fine_segment, jobs)):
+                fine_results[j] = (x, v)
+                fine_starts[j] = boundaries[j][0]
+                fine_samples[j] = samples
+                segment_seconds.append(seconds)
+            fine_elapsed = time.perf_counter() - iteration_started
+
+            # Sequential correction sweep.
+            new_boundaries = [boundaries[0]]
+            new_coarse = []
+            largest = 0.0
+            stale = set()
+            for j in range(segments):
+                predicted = coarse(new_boundaries[j])
+                new_coarse.append(predicted)
+                corrected = tuple(
+                    predicted[k] + fine_results[j][k] - coarse_results[j][k] for k in range(2)
+                )
+                moved = float(np.max(np.linalg.norm(corrected[0] - boundaries[j + 1][0], axis=-1)))
+                largest = max(largest, moved)
+                # Compared with the start the stored fine run actually used,
+                # so small moves cannot add up unnoticed.
+                if j + 1 < segments and np.max(np.linalg.norm(corrected[0] - fine_starts[j + 1], axis=-1)) > tolerance_km:
+                    stale.add(j + 1)
+                new_boundaries.append(corrected)
+
+            report["iterations"].append({
+                "iteration": iteration,
+                "max_correction_km": largest,
+                "segments_rerun": len(rerun),
+                "fine_seconds": fine_elapsed,
+                "seconds": time.perf_counter() - iteration_started,
+            })
+            boundaries = new_boundaries
+            coarse_results = new_coarse
+            if largest <= tolerance_km:
+                report["converged"] = True
+                break
+
+    # Segments whose start moved by no more than the tolerance keep their
+    # fine samples; the run ends at the last fine state.
+    samples = [{} for _ in specs]
+    for segment in fine_samples:
+        for i, body_samples in enumerate(segment):
+            samples[i].update(body_samples)
+
+    report["seconds"] = time.perf_counter() - started
+    # What the plain sequential run would have cost: every segment once.
+    report["sequential_estimate_seconds"] = float(np.mean(segment_seconds)) * segments
+    report["speedup"] = report["sequential_estimate_seconds"] / report["seconds"]
+    final_x, final_v = fine_results[-1]
+    return samples, final_x, final_v, report
@@ -0,0 +1,200 @@
+import numpy as np
+
+from .twobody import propagate_kepler
+from .utils import interpolate_states
+
+# Upper bound on sphere-of-influence switches in one preview, so a probe
+# grazing an SOI boundary cannot flip back and forth forever.
+MAX_SOI_SWITCHES = 16
+
+
+class Attractor:
+    """
+    A massive body for the preview: its mass and stored ephemeris.
+
+    Between its samples the body follows the ephemeris. Past the last one it
+    continues on a Kepler orbit about its primary (see build_hierarchy),
+    starting from its stored state. Bodies with fewer than two samples (the
+    Sun, or never simulated) are held at their stored position.
+    """
+
+    def __init__(self, name: str, mass: float, times: np.ndarray, positions: np.ndarray, position=None, velocity=None):
+        self.name = name
+        self.mass = mass
+        self.times = np.asarray(times, dtype=float)
+        self.positions = np.asarray(positions, dtype=float).reshape(-1, 3)
+        self.position = np.asarray(position if position is not None else self.positions[-1] if len(self.positions) else np.zeros(3), dtype=float)
+        self.velocity = np.asarray(velocity if velocity is not None else np.zeros(3), dtype=float)
+        self.primary = None
+        self.mu = None
+        self.soi_radius = np.inf
+
+        if not self.fixed:
+            # The stored state is the state at the last sample when the two
+            # agree; otherwise estimate it from the samples.
+            end_position, end_velocity = interpolate_states(self.times, self.positions, self.times[-1:])
+            if velocity is None or np.linalg.norm(self.position - end_position[0]) > 1.0:
+                self.position, self.velocity = end_position[0], end_velocity[0]
+
+    @property
+    def fixed(self) -> bool:
+        return len(self.times) < 2
+
+    def states(self, query_times) -> tuple:
+        """(positions, velocities) at the query times, shape (m, 3) each."""
+        query_times = np.asarray(query_times, dtype=float)
+        if self.fixed:
+            return np.tile(self.position, (len(query_times), 1)), np.zeros((len(query_times), 3))
+
+        positions, velocities = interpolate_states(self.times, self.positions, query_times)
+        beyond = query_times > self.times[-1]
+        if np.any(beyond) and self.primary is not None:
+            end = self.times[-1]
+            primary_positions, primary_velocities = self.primary.states(np.r_[end, query_times[beyond]])
+            relative, relative_velocity = propagate_kepler(
+                self.position - primary_positions[0],
+                self.velocity - primary_velocities[0],
+                self.mu,
+                query_times[beyond] - end
+            )
+            positions[beyond] = relative[0] + primary_positions[1:]
+            velocities[beyond] = relative_velocity[0] + primary_velocities[1:]
+        return positions, velocities
+
+    def coverage_end(self) -> float:
+        return np.inf if self.fixed else float(self.times[-1])
+
+
+def build_hierarchy(attractors: list, at_time: float, G: float) -> Attractor:
+    """
+    Nest the attractors by sphere of influence at `at_time`, or at the end
+    of the shortest ephemeris if that is earlier.
+
+    The most massive body is the root. Every other body, heaviest first,
+    orbits the already placed body with the smallest sphere of influence
+    that contains it (the root if none does), and its own sphere of
+    influence is the Laplace radius a (m / M)^(2/5), with a its distance
+    from that primary.
+
+    Returns:
+        Attractor: the root
+    """
+    ordered = sorted(attractors, key=lambda attractor: attractor.mass, reverse=True)
+    for attractor in ordered:
+        attractor.primary = None
+    root = ordered[0]
+    root.soi_radius = np.inf
+    placed = [root]
+    at_time = min(at_time, min(attractor.coverage_end() for attractor in ordered))
+    positions = {attractor.name: attractor.states([at_time])[0][0] for attractor in ordered}
+
+    for attractor in ordered[1:]:
+        containing = [
+            candidate for candidate in placed
+            if np.linalg.norm(positions[attractor.name] - positions[candidate.name]) < candidate.soi_radius
+        ]
+        primary = min(containing, key=lambda candidate: candidate.soi_radius)
+        distance = np.linalg.norm(positions[attractor.name] - positions[primary.name])
+        attractor.primary = primary
+        attractor.mu = G * (primary.mass + attractor.mass)
+        attractor.soi_radius = distance * (attractor.mass / primary.mass) ** 0.4
+        placed.append(attractor)
+    return root
+
+
+def central_body_at(attractors: list, position: np.ndarray, at_time: float) -> Attractor:
+    """The attractor with the smallest sphere of influence containing `position`."""
+    containing = [
+        attractor for attractor in attractors
+        if np.linalg.norm(position - attractor.states([at_time])[0][0]) < attractor.soi_radius
+    ]
+    return min(containing, key=lambda attractor: attractor.soi_radius)
+
+
+def patched_conic_preview(position, velocity, start_time: float, query_times, attractors: list, G: float) -> dict:
+    """
+    Approximate trajectory of a maneuvered body with patched conics.
+
+    The body follows a Kepler orbit about one central body at a time, the
+    attractor whose sphere of influence it is in. The whole remaining time
+    grid is propagated in one vectorized Kepler call; at the first sample
+    outside the central body's sphere, or inside one of its satellites',
+    the state is re-expressed about the new central body and propagation
+    continues from there. Switches are resolved to the sample spacing.
+
+    Args:
+        position: position after the burn in km, shape (3,)
+        velocity: velocity after the burn in km/s, shape (3,)
+        start_time: time of the burn (in seconds from reference date)
+        query_times: sorted times to evaluate at, none before start_time
+        attractors: Attractor objects, the maneuvered body excluded
+        G: gravitational constant in km^3/(kg·s^2)
+
+    Returns:
+        dict: "times", "positions" (m, 3) and "segments", a list of
+              (central body name, start time, end time)
+
+    Raises:
+        ValueError: if a conic cannot be propagated (propagate_kepler
+            returned NaN)
+    """
+    query_times = np.asarray(query_times, dtype=float)
+    build_hierarchy(attractors, start_time, G)
+    children = {attractor.name: [a for a in attractors if a.primary is attractor] for attractor in attractors}
+
+    position = np.asarray(position, dtype=float)
+    velocity = np.asarray(velocity, dtype=float)
+    epoch = start_time
+    central = central_body_at(attractors, position, epoch)
+
+    positions = np.empty((len(query_times), 3))
+    segments = []
+    done = 0
+    while True:
+        remaining = query_times[done:]
+        center, center_velocity = central.states(np.r_[epoch, remaining])
+        relative, relative_velocity = propagate_kepler(
+            position - center[0],
+            velocity - center_velocity[0],
+            G * central.mass,
+            remaining - epoch
+        )
+        relative, relative_velocity = relative[0], relative_velocity[0]
+        if not np.all(np.isfinite(relative)):
+            # An unconverged Kepler solve would otherwise pass for an SOI exit.
+            raise ValueError(f"Kepler propagation about {central.name} did not converge after t={epoch}")
+        absolute = relative + center[1:]
+
+        # First sample leaving the central body's sphere or entering a satellite's.
+        events = []
+        outside = np.flatnonzero(np.linalg.norm(relative, axis=1) > central.soi_radius)
+        if len(outside):
+            events.append((outside[0], central.primary))
+        for child in children[central.name]:
+            inside = np.flatnonzero(np.linalg.norm(absolute - child.states(remaining)[0], axis=1) < child.soi_radius)
+            if len(inside):
+                events.append((inside[0], child))
+
+        if not events:
+            positions[done:] = absolute
+            segments.append((central.name, epoch, float(query_times[-1])))
+            break
+
+        index, next_central = min(events, key=lambda event: event[0])
+        positions[done:done + index + 1] = absolute[:index + 1]
+        switch_time = float(remaining[index])
+        segments.append((central.name, epoch, switch_time))
+        if done + index + 1 == len(query_times):
+            break
+        if len(segments) > MAX_SOI_SWITCHES:
+            # Out of switches: finish on the current conic.
+            positions[done + index + 1:] = absolute[index + 1:]
+            segments[-1] = (central.name, epoch, float(query_times[-1]))
+            break
+        position = absolute[index]
+        velocity = relative_velocity[index] + center_velocity[index + 1]
+        epoch = switch_time
+        done += index + 1
+        central = next_central
+
+    return {"times": query_times, "positions": positions, "segments": segments}
@@ -0,0 +1,94 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .twobody import solve_lambert
+from .utils import interpolate_states
+
+# Grids smaller than this are solved in-process; forking workers costs more
+# than it saves.
+PARALLEL_GRID_THRESHOLD = 50_000
+
+
+def lambert_grid_rows(r1, v1, t1, r2, v2, t2, mu: float) -> tuple:
+    """
+    Solve every departure/arrival combination for a block of departure rows.
+
+    Args:
+        r1, v1: departure body states relative to the central body, shape (n, 3)
+        t1: departure times in seconds, shape (n,)
+        r2, v2: arrival body states relative to the central body, shape (m, 3)
+        t2: arrival times in seconds, shape (m,)
+        mu: gravitational parameter of the central body in km^3/s^2
+
+    Returns:
+        tuple: (C3, departure delta-v, arrival delta-v) matrices of shape (n, m)
+    """
+    n, m = len(t1), len(t2)
+    tof = t2[None, :] - t1[:, None]
+
+    departure_r = np.broadcast_to(r1[:, None, :], (n, m, 3)).reshape(-1, 3)
+    arrival_r = np.broadcast_to(r2[None, :, :], (n, m, 3)).reshape(-1, 3)
+    transfer_v1, transfer_v2 = solve_lambert(departure_r, arrival_r, tof.ravel(), mu)
+
+    departure_v_inf = transfer_v1.reshape(n, m, 3) - v1[:, None, :]
+    arrival_v_inf = v2[None, :, :] - transfer_v2.reshape(n, m, 3)
+    departure_dv = np.linalg.norm(departure_v_inf, axis=-1)
+    arrival_dv = np.linalg.norm(arrival_v_inf, axis=-1)
+    return departure_dv**2, departure_dv, arrival_dv
+
+
+def _solve_rows(args):
+    return lambert_grid_rows(*args)
+
+
+def porkchop_grid(origin_ephemeris: tuple, target_ephemeris: tuple, central_ephemeris: tuple,
+                  departure_times: np.ndarray, arrival_times: np.ndarray, mu: float, workers: int = None) -> dict:
+    """
+    Launch-window grid between two bodies from their stored ephemerides.
+
+    Args:
+        origin_ephemeris: (times, positions) of the departure body
+        target_ephemeris: (times, positions) of the arrival body
+        central_ephemeris: (times, positions) of the body the transfer orbits
+        departure_times: departure grid in seconds from reference date, shape (n,)
+        arrival_times: arrival grid in seconds from reference date, shape (m,)
+        mu: gravitational parameter of the central body in km^3/s^2
+        workers: number of worker processes (default: CPU count)
+
+    Returns:
+        dict: "c3", "departure_dv", "arrival_dv" and "total_dv" matrices of
+              shape (n, m); cells with arrival before departure are NaN
+    """
+    for times, label in ((origin_ephemeris[0], "origin"), (target_ephemeris[0], "target"), (central_ephemeris[0], "central body")):
+        if len(times) < 2:
+            raise ValueError(f"No stored trajectory for the {label}")
+    if departure_times.min() < origin_ephemeris[0][0] or departure_times.max() > origin_ephemeris[0][-1]:
+        raise ValueError("Departure dates fall outside the stored trajectory of the origin")
+    if arrival_times.min() < target_ephemeris[0][0] or arrival_times.max() > target_ephemeris[0][-1]:
+        raise ValueError("Arrival dates fall outside the stored trajectory of the target")
+
+    r1, v1 = interpolate_states(*origin_ephemeris, departure_times)
+    r2, v2 = interpolate_states(*target_ephemeris, arrival_times)
+    central_r1, central_v1 = interpolate_states(*central_ephemeris, departure_times)
+    central_r2, central_v2 = interpolate_states(*central_ephemeris, arrival_times)
+    r1, v1 = r1 - central_r1, v1 - central_v1
+    r2, v2 = r2 - central_r2, v2 - central_v2
+
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(departure_times) * len(arrival_times) >= PARALLEL_GRID_THRESHOLD:
+        chunks = np.array_split(np.arange(len(departure_times)), workers)
+        jobs = [(r1[rows], v1[rows], departure_times[rows], r2, v2, arrival_times, mu) for rows in chunks if len(rows)]
+        with ProcessPoolExecutor(max_workers=len(jobs)) as pool:
+            blocks = list(pool.map(_solve_rows, jobs))
+        c3, departure_dv, arrival_dv = (np.concatenate(parts) for parts in zip(*blocks))
+    else:
+        c3, departure_dv, arrival_dv = lambert_grid_rows(r1, v1, departure_times, r2, v2, arrival_times, mu)
+
+    return {
+        "c3": c3,
+        "departure_dv": departure_dv,
+        "arrival_dv": arrival_dv,
+        "total_dv": departure_dv + arrival_dv,
+    }
@@ -0,0 +1,187 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Response
+
+from .executors import run_db
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Upper bound on the serialized, compressed payloads kept per worker.
+PAYLOAD_CACHE_BYTES = int(os.getenv("PAYLOAD_CACHE_BYTES", str(64 * 1024 * 1024)))
+
+# Payloads smaller than this are sent uncompressed.
+MINIMUM_COMPRESS_SIZE = 1024
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def dumps(payload) -> bytes:
+    """Serialize to JSON with orjson when installed, numpy arrays included."""
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload, separators=(",", ":")).encode()
+
+
+def body_versions(bodies) -> list:
+    """(name, id, trajectory_version, trajectory_updated_at) rows for validators, without loading trajectories."""
+    return list(bodies.order_by("name").values_list("name", "id", "trajectory_version", "trajectory_updated_at"))
+
+
+def make_etag(versions: list, *key) -> str:
+    """Strong ETag over the version of every body involved and the request parameters."""
+    digest = hashlib.sha1(repr(([row[:3] for row in versions], key)).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def last_modified(versions: list):
+    stamps = [row[3] for row in versions if row[3] is not None]
+    return max(stamps) if stamps else None
+
+
+def is_not_modified(request_headers, etag: str, modified_at) -> bool:
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match takes precedence; compare weakly as RFC 9110 asks.
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
+    if_modified_since = request_headers.get("if-modified-since")
+    if if_modified_since is not None and modified_at is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        # HTTP dates have one-second resolution.
+        return modified_at.replace(microsecond=0) <= since
+    return False
+
+
+def negotiate_encoding(accept_encoding: str) -> str:
+    accepted = {
+        part.split(";")[0].strip().lower()
+        for part in (accept_encoding or "").split(",")
+        if not part.strip().endswith(";q=0")
+    }
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return "identity"
+
+
+def compress(content: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(content, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(content, compresslevel=GZIP_LEVEL)
+    return content
+
+
+class PayloadCache:
+    """
+    Byte-bounded LRU of ready-to-send payloads keyed by (ETag, encoding).
+
+    An ETag changes whenever one of the trajectories behind it is rewritten,
+    so entries never need invalidating; stale ones simply age out.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, content: bytes, headers: dict):
+        if len(content) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = (content, headers)
+            self.size += len(content)
+            while self.size > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self.size, "hits": self.hits, "misses": self.misses}
+
+
+payload_cache = PayloadCache(PAYLOAD_CACHE_BYTES)
+
+
+def _build_entry(build, encoding: str) -> tuple:
+    payload, extra_headers = build()
+    content = dumps(payload)
+    used_encoding = encoding if len(content) >= MINIMUM_COMPRESS_SIZE else "identity"
+    return compress(content, used_encoding), {**extra_headers, "Content-Encoding": used_encoding}
+
+
+async def cached_json_response(request, versions: list, key: tuple, build) -> Response:
+    """
+    Conditional, compressed JSON response for data derived from stored trajectories.
+
+    Answers 304 when the client's validators still match. Otherwise serves
+    the serialized, compressed payload from the cache, calling `build` only
+    on a miss. Only the validator check and the cache lookup run on the
+    event loop; building, serializing and compressing a payload can take
+    long enough to stall every other request, so a miss runs them on the
+    database pool.
+
+    Args:
+        request: incoming request, for its conditional and Accept-Encoding headers
+        versions: body_versions() rows of every body the payload depends on
+        key: request parameters that select the payload (endpoint, dates, ...)
+        build: blocking function returning (payload, extra response headers)
+
+    Returns:
+        Response
+    """
+    etag = make_etag(versions, *key)
+    modified_at = last_modified(versions)
+    headers = {"ETag": etag, "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+    if modified_at is not None:
+        headers["Last-Modified"] = format_datetime(modified_at, usegmt=True)
+
+    if is_not_modified(request.headers, etag, modified_at):
+        return Response(status_code=304, headers=headers)
+
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    entry = payload_cache.get((etag, encoding))
+    if entry is None:
+        entry = await run_db(_build_entry, build, encoding)
+        payload_cache.put((etag, encoding), *entry)
+
+    content, extra_headers = entry
+    headers.update(extra_headers)
+    if headers["Content-Encoding"] == "identity":
+        del headers["Content-Encoding"]
+    return Response(content=content, media_type="application/json", headers=headers)
@@ -0,0 +1,122 @@
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+
+from .models import BodyModel, Scenario, resolve_bodies
+from .simulation import get_state_at_time
+
+# One lock per scenario (None is the default namespace). Writes to the same
+# scenario queue up; writes to different scenarios never wait on each other.
+# Entries are [lock, holders] and are dropped with their last holder, so
+# the table only holds scenarios being written.
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+@contextmanager
+def scenario_write_lock(scenario):
+    """
+    Hold a scenario for writing.
+
+    Serializes writers to the same scenario within this worker for the whole
+    write, simulation included. No database transaction is held meanwhile:
+    each save runs in its own short transaction (save_bodies_raw,
+    own_bodies and the simulations' final saves are atomic), so readers and
+    other workers are never blocked behind a running integration.
+    """
+    key = getattr(scenario, "pk", None)
+    with _locks_guard:
+        entry = _locks.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _locks_guard:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del _locks[key]
+
+
+def get_scenario(name: str, create: bool = False):
+    """
+    Look up a scenario by name; None selects the default namespace.
+
+    Raises:
+        Scenario.DoesNotExist: if the scenario is unknown and `create` is False
+    """
+    if name is None:
+        return None
+    if create:
+        return Scenario.objects.get_or_create(name=name)[0]
+    return Scenario.objects.get(name=name)
+
+
+def fork_scenario(name: str, parent=None) -> Scenario:
+    """
+    Create a copy-on-write fork of `parent` (the default namespace when None).
+
+    Nothing is copied up front: the fork reads its parent's bodies until
+    own_bodies copies the ones it writes to.
+    """
+    return Scenario.objects.create(name=name, parent=parent, is_fork=True)
+
+
+def own_bodies(scenario, bodies: list, start_time: float = None) -> list:
+    """
+    Copy-on-write: make sure the scenario owns every body it is about to write.
+
+    Inherited bodies are copied into the scenario with base_time set to
+    `start_time` and their state at that time, restored from the inherited
+    trajectory, so the copy stores only the samples the write produces and
+    keeps reading earlier ones (up to and including start_time) from the
+    parent. Copies whose base_time is
+    later than `start_time` take over the samples in between first, since
+    the write will not reproduce them.
+
+    Args:
+        scenario: the scenario being written, None for the default namespace
+        bodies: bodies resolved in the scenario
+        start_time: time the write starts from (in seconds from reference date)
+
+    Returns:
+        list: the scenario's own BodyModel for each body, in the same order
+    """
+    if scenario is None:
+        return bodies
+
+    start_time = start_time if start_time is not None else 0.0
+    owned = []
+    with transaction.atomic():
+        for body in bodies:
+            if body.scenario_id != scenario.pk:
+                copy = BodyModel(
+                    scenario=scenario,
+                    name=body.name,
+                    mass=body.mass,
+                    base_time=start_time,
+                    snapshot_policy=body.snapshot_policy
+                )
+                # The parent's row holds its state at the end of its run, not at
+                # start_time.
+                position, velocity = body.position, body.velocity
+                if body.name != "Sun":
+                    position, velocity = get_state_at_time(body, start_time)
+                copy.position = position
+                copy.velocity = velocity
+                copy._base_body = body
+                copy.save()
+                body = copy
+            elif body.base_time is not None and body.base_time > start_time:
+                trajectory = body.get_trajectory()
+                body.base_time = start_time
+                body.set_trajectory(trajectory)
+                body.save()
+            owned.append(body)
+    return owned
+
+
+def scenario_bodies(scenario, names=None) -> list:
+    """Bodies visible in a scenario as a list."""
+    return list(resolve_bodies(scenario, names).values())
@@ -0,0 +1,153 @@
+import asyncio
+import os
+import threading
+
+from .executors import run_compute
+from .simulation import SimulationCancelled
+
+# Quiet period after the last maneuver request before a scenario is
+# resimulated; requests arriving within it share one run.
+MANEUVER_DEBOUNCE_SECONDS = float(os.getenv("MANEUVER_DEBOUNCE_SECONDS", "0.25"))
+
+
+class ManeuverSuperseded(Exception):
+    """The maneuver was replaced by a newer request for the same body before it ran."""
+
+
+class PendingManeuver:
+    def __init__(self, body_name: str, delta_velocity, simulation_time, future):
+        self.body_name = body_name
+        self.delta_velocity = delta_velocity
+        self.simulation_time = simulation_time
+        self.future = future
+
+    def supersede(self):
+        if not self.future.done():
+            self.future.set_exception(ManeuverSuperseded(f"Superseded by a newer maneuver for {self.body_name}"))
+
+
+class RunningBatch:
+    def __init__(self, maneuvers: dict):
+        self.maneuvers = maneuvers
+        # Burns replaced by newer requests after the cancel; whether they
+        # were applied is only known once the run returns.
+        self.replaced = []
+        self.cancel = threading.Event()
+
+    def invalidated_by(self, body_name: str, simulation_time) -> bool:
+        # A newer burn for the same body replaces one in this run, and a burn
+        # earlier than any of its burns resimulates over them without them.
+        if body_name in self.maneuvers:
+            return True
+        latest = max((m.simulation_time or 0.0) for m in self.maneuvers.values())
+        return (simulation_time or 0.0) < latest
+
+
+class ManeuverScheduler:
+    """
+    Debounces and coalesces maneuver requests per scenario.
+
+    Requests for a scenario, timed or not, collect while it is quiet for
+    `debounce` seconds, then run together in one resimulation, so at most
+    one run per scenario is ever in flight. A newer request for a body
+    replaces its pending one, whose caller gets ManeuverSuperseded. A
+    request that invalidates the run in progress cancels it. If the run
+    stops before saving, its other burns are carried over into the next run,
+    so each caller still gets the result of a run that includes its burn,
+    and the burns replaced in it are superseded. If it finishes anyway, all
+    of its burns, replaced ones included, are saved and answered by it
+    instead of being applied a second time.
+
+    Args:
+        run_batch: blocking callable (scenario, burns, should_cancel) returning
+            the trajectories, where burns is a list of (time, body name, delta-v);
+            it runs on the compute pool
+        debounce: quiet period in seconds
+    """
+
+    def __init__(self, run_batch, debounce: float = MANEUVER_DEBOUNCE_SECONDS):
+        self.run_batch = run_batch
+        self.debounce = debounce
+        self._pending = {}
+        self._timers = {}
+        self._running = {}
+        self.stats = {"requests": 0, "superseded": 0, "runs": 0, "cancelled_runs": 0}
+
+    async def submit(self, key, scenario, body_name: str, delta_velocity, simulation_time=None):
+        """Queue a maneuver and wait for the trajectories of the run that applies it."""
+        loop = asyncio.get_running_loop()
+        maneuver = PendingManeuver(body_name, delta_velocity, simulation_time, loop.create_future())
+        self.stats["requests"] += 1
+
+        pending = self._pending.setdefault(key, {})
+        previous = pending.pop(body_name, None)
+        if previous is not None:
+            previous.supersede()
+            self.stats["superseded"] += 1
+
+        running = self._running.get(key)
+        if running is not None:
+            if not running.cancel.is_set() and running.invalidated_by(body_name, simulation_time):
+                running.cancel.set()
+                self.stats["cancelled_runs"] += 1
+            if running.cancel.is_set():
+                # Not carried over: this request replaces it, unless the run
+                # saves it anyway.
+                replaced = running.maneuvers.pop(body_name, None)
+                if replaced is not None:
+                    running.replaced.append(replaced)
+
+        pending[body_name] = maneuver
+        self._schedule(key, scenario)
+        return await maneuver.future
+
+    def _supersede(self, maneuvers):
+        for m in maneuvers:
+            if not m.future.done():
+                m.supersede()
+                self.stats["superseded"] += 1
+
+    def _schedule(self, key, scenario):
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        loop = asyncio.get_running_loop()
+        self._timers[key] = loop.call_later(self.debounce, lambda: asyncio.ensure_future(self._flush(key, scenario)))
+
+    async def _flush(self, key, scenario):
+        self._timers.pop(key, None)
+        if key in self._running:
+            # Picked up when the current run finishes.
+            return
+        maneuvers = self._pending.pop(key, None)
+        if not maneuvers:
+            return
+
+        running = RunningBatch(maneuvers)
+        self._running[key] = running
+        burns = [(m.simulation_time, m.body_name, m.delta_velocity) for m in maneuvers.values()]
+        self.stats["runs"] += 1
+        try:
+            result = await run_compute(self.run_batch, scenario, burns, running.cancel.is_set)
+        except SimulationCancelled:
+            # Nothing was saved: the burns go into the next run.
+            pending = self._pending.setdefault(key, {})
+            for name, carried in running.maneuvers.items():
+                pending.setdefault(name, carried)
+            self._supersede(running.replaced)
+        except Exception as e:
+            for m in running.maneuvers.values():
+                if not m.future.done():
+                    m.future.set_exception(e)
+            self._supersede(running.replaced)
+        else:
+            # Also when cancelled too late to stop: the burns are saved, and
+            # carrying them over would apply them twice. A replaced burn was
+            # saved too, so its caller gets this run rather than a 409.
+            for m in [*running.maneuvers.values(), *running.replaced]:
+                if not m.future.done():
+                    m.future.set_result(result)
+        finally:
+            del self._running[key]
+            if self._pending.get(key):
+                self._schedule(key, scenario)
@@ -1,6 +1,12 @@
 import numpy as np
+from django.conf import settings
+from django.db import transaction
 from .models import BodyModel
-import json
+from .ephemeris import trajectory_arrays
+from .trajectory_cache import trajectory_cache
+from .snapshots import recorders_for
+from .parareal import parareal
+from .forces import tiled_accelerations
 
 from datetime import datetime, timedelta
 from .utils import date_to_seconds
@@ -14,51 +20,41 @@ QUARTERS_TO_SIMULATE = 4  # number of 3-month periods to simulate
 STEPS_PER_QUARTER = int(90 * 24 * 60 * 60 / TIME_STEP)  # steps for 3 months (90 days)
 SNAPSHOT_INTERVAL = 52
 
+class SimulationCancelled(Exception):
+    """Raised by nbody_simulation_verlet when its should_cancel callback returns True."""
+
 def compute_accelerations(bodies):
-    n = len(bodies)
-    accelerations = [np.zeros(3) for _ in range(n)]
+    positions = np.array([body.position for body in bodies], dtype=float).reshape(-1, 3)
+    masses = np.array([body.mass for body in bodies], dtype=float)
+    accelerations = tiled_accelerations(positions, masses, G)
 
+    # Skip acceleration for the Sun - it stays fixed
     for i, body in enumerate(bodies):
-        # Skip acceleration calculation for the Sun - it stays fixed
         if body.name == "Sun":
-            continue
-            
-        for j, other_body in enumerate(bodies):
-            if i != j:
-                r_ij = other_body.position - body.position
-                dist = np.linalg.norm(r_ij)
-                if dist > 0:
-                    accelerations[i] += G * other_body.mass * r_ij / dist**3
+            accelerations[i] = 0.0
+
+    return list(accelerations)
 
-    return accelerations
+def history_until(body: BodyModel, time: float) -> dict:
+    """A body's stored trajectory up to and including `time`, keyed like stored trajectories."""
+    return {t: p for t, p in body.get_trajectory().items() if float(t) <= time}
 
 def get_last_state(body: BodyModel):
     """
     Get the last known state from the trajectory history.
     Returns (position, velocity, time) or None if no history exists.
     """
-    if not body.trajectory_json:
+    times, positions = trajectory_arrays(body)
+    if len(times) == 0:
         return None
-    
-    trajectory = json.loads(body.trajectory_json)
-    if not trajectory:
-        return None
-    
-    # Get the last timestamp and position
-    last_time = max(float(t) for t in trajectory.keys())
-    last_position = trajectory[str(last_time)]
-    
+
     # Estimate velocity from last two positions if available
-    times = sorted(float(t) for t in trajectory.keys())
     if len(times) >= 2:
-        last_two_times = times[-2:]
-        last_two_positions = [trajectory[str(t)] for t in last_two_times]
-        dt = last_two_times[1] - last_two_times[0]
-        velocity = (np.array(last_two_positions[1]) - np.array(last_two_positions[0])) / dt
+        velocity = (positions[-1] - positions[-2]) / (times[-1] - times[-2])
     else:
         velocity = body.velocity  # Use current velocity if can't estimate from history
-    
-    return np.array(last_position), velocity, last_time
+
+    return np.array(positions[-1]), velocity, float(times[-1])
 
 def apply_maneuver(body: BodyModel, delta_velocity: np.ndarray, simulation_time: float = None):
     """
@@ -89,6 +85,8 @@ def apply_maneuver(body: BodyModel, delta_velocity: np.ndarray, simulation_time:
     new_velocity = current_velocity + delta_velocity
     body.velocity = new_velocity
     body.save()
+    # The stored arc no longer continues from the body's state.
+    trajectory_cache.invalidate(body.pk)
     return body
 
 def get_state_at_time(body: BodyModel, target_time: float) -> tuple:
@@ -103,72 +101,58 @@ def get_state_at_time(body: BodyModel, target_time: float) -> tuple:
     Returns:
         tuple: (position, velocity) at the target time
     """
-    if not body.trajectory_json:
+    times, positions = trajectory_arrays(body)
+    if len(times) == 0:
         return body.position, body.velocity
-        
-    trajectory = json.loads(body.trajectory_json)
-    if not trajectory:
-        return body.position, body.velocity
-        
-    # Convert all timestamps to floats and sort them
-    times = sorted(float(t) for t in trajectory.keys())
-    
-    # Find the closest times before and after target_time
-    before_time = None
-    after_time = None
-    for t in times:
-        if t <= target_time:
-            before_time = t
-        else:
-            after_time = t
-            break
-    
-    if before_time is None:
+
+    # Index of the first recorded time after target_time
+    after = int(np.searchsorted(times, target_time, side="right"))
+
+    if after == 0:
         # Target time is before first recorded state
-        first_time = times[0]
-        return np.array(trajectory[str(first_time)]), body.velocity
-    elif after_time is None:
+        return np.array(positions[0]), body.velocity
+    elif after == len(times):
         # Target time is after last recorded state
-        last_time = times[-1]
-        return np.array(trajectory[str(last_time)]), body.velocity
+        return np.array(positions[-1]), body.velocity
     else:
         # Interpolate between states
-        before_pos = np.array(trajectory[str(before_time)])
-        after_pos = np.array(trajectory[str(after_time)])
-        
+        before_time, after_time = times[after - 1], times[after]
+        before_pos, after_pos = positions[after - 1], positions[after]
+
         # Linear interpolation
         alpha = (target_time - before_time) / (after_time - before_time)
         interpolated_pos = before_pos + alpha * (after_pos - before_pos)
-        
-        # Estimate velocity from the two positions
-        velocity = (after_pos - before_pos) / (after_time - before_time)
-        
+
+        # Velocity from central differences at the two samples, as in
+        # utils.interpolate_states; the chord between them alone is off by
+        # half a snapshot's worth of acceleration. One neighbour on each
+        # side is all the differences need.
+        lo, hi = max(after - 2, 0), min(after + 2, len(times))
+        sample_velocities = np.gradient(positions[lo:hi], times[lo:hi], axis=0)
+        before_vel, after_vel = sample_velocities[after - 1 - lo], sample_velocities[after - lo]
+        velocity = before_vel + alpha * (after_vel - before_vel)
+
         return interpolated_pos, velocity
 
-def nbody_simulation_verlet(bodies, dt=TIME_STEP, steps=STEPS_PER_QUARTER, snapshot_interval=SNAPSHOT_INTERVAL, save_final=True, start_time=None):
+def nbody_simulation_verlet(bodies, dt=TIME_STEP, steps=STEPS_PER_QUARTER, snapshot_interval=SNAPSHOT_INTERVAL, save_final=True, start_time=None, maneuvers=None, burns=None, should_cancel=None):
     """
     bodies: list of BodyModel
     dt: time step in seconds (default: TIME_STEP)
     steps: number of simulation steps (default: STEPS_PER_QUARTER)
-    snapshot_interval: interval between trajectory snapshots (default: SNAPSHOT_INTERVAL)
+    snapshot_interval: interval between trajectory snapshots (default: SNAPSHOT_INTERVAL);
+        the cadence for bodies whose snapshot policy (see orbits.snapshots) is fixed
     save_final: if True, updates the DB after finishing
     start_time: The time to start the simulation from (in seconds from reference date)
+    maneuvers: optional {body name: delta-v in km/s} applied at start_time, after
+        the starting state has been restored from history
+    burns: optional list of (time, body name, delta-v in km/s); each is applied at
+        the first step boundary at or after its time (None means at the start)
+    should_cancel: optional callable polled every snapshot; when it returns True
+        the run stops with SimulationCancelled before anything is saved
     """
     current_time = start_time if start_time is not None else 0.0
     print(f"Starting simulation at time {current_time}")
 
-    # Initialize trajectories from history if available
-    trajectories = {}
-    for body in bodies:
-        if body.trajectory_json:
-            trajectories[body.name] = json.loads(body.trajectory_json)
-        else:
-            trajectories[body.name] = {}
-        # Add current position if not already in trajectory
-        if f"{current_time}" not in trajectories[body.name]:
-            trajectories[body.name][f"{current_time}"] = body.position.tolist()
-    print(f"Initial trajectories: {trajectories}")
-
     # If start_time is provided, get the state at that time for each body
     if start_time is not None:
         for body in bodies:
@@ -178,6 +162,47 @@ def nbody_simulation_verlet(bodies, dt=TIME_STEP, steps=STEPS_PER_QUARTER, snaps
                 body.velocity = velocity
                 body.save()
 
+    # Initialize trajectories from history if available. Samples after
+    # current_time belong to the run being replaced; the new run's sample
+    # times rarely match theirs (adaptive and windowed policies), so they
+    # would stay interleaved with it if kept.
+    trajectories = {}
+    for body in bodies:
+        trajectories[body.name] = history_until(body, current_time)
+        # Add the starting position if not already in trajectory; restored
+        # above, so it is the state at current_time and not the end of the
+        # last run.
+        if f"{current_time}" not in trajectories[body.name]:
+            trajectories[body.name][f"{current_time}"] = body.position.tolist()
+    print(f"Initial trajectories: {trajectories}")
+
+    if maneuvers:
+        for body in bodies:
+            if body.name in maneuvers and body.name != "Sun":
+                body.velocity = body.velocity + np.asarray(maneuvers[body.name], dtype=float)
+                body.save()
+
+    pending_burns = sorted(
+        ((time if time is not None else current_time, name, np.asarray(delta_v, dtype=float))
+         for time, name, delta_v in (burns or []) if name != "Sun"),
+        key=lambda burn: burn[0]
+    )
+    by_name = {body.name: body for body in bodies}
+
+    def apply_due_burns():
+        burned = set()
+        while pending_burns and pending_burns[0][0] <= current_time:
+            _, name, delta_v = pending_burns.pop(0)
+            by_name[name].velocity = by_name[name].velocity + delta_v
+            burned.add(name)
+        return burned
+
+    # Each body decides when to record; burns are the events windowed
+    # policies zoom in around.
+    events = [burn[0] for burn in pending_burns] + ([current_time] if maneuvers else [])
+    recorders = recorders_for(bodies, snapshot_interval, current_time, dt, events)
+
+    apply_due_burns()
     accelerations = compute_accelerations(bodies)
 
     for step in range(1, steps+1):
@@ -192,23 +217,31 @@ def nbody_simulation_verlet(bodies, dt=TIME_STEP, steps=STEPS_PER_QUARTER, snaps
                 body.velocity = body.velocity + 0.5 * (accelerations[i] + new_acc[i]) * dt
 
         current_time += dt
+        # A burn only changes velocity, so the accelerations stay valid.
+        burned = apply_due_burns()
 
-        if (step % snapshot_interval == 0) or (step == steps):
-            for body in bodies:
+        for i, body in enumerate(bodies):
+            recorder = recorders[body.name]
+            # A burn bends the path, so the sample at the burn is always kept.
+            if recorder.should_record(step, current_time, new_acc[i]) or body.name in burned or step == steps:
                 trajectories[body.name][f"{current_time}"] = body.position.tolist()
+                recorder.recorded(current_time)
+
+        if (step % snapshot_interval == 0) or (step == steps):
+            if should_cancel is not None and should_cancel():
+                raise SimulationCancelled(f"Simulation cancelled at time {current_time}")
 
         accelerations = new_acc
 
     if save_final:
         print("Saving final trajectories to database")
-        for body in bodies:
-            # Get existing trajectory from database
-            existing_trajectory = body.get_trajectory()
-            # Merge with new trajectory data
-            existing_trajectory.update(trajectories[body.name])
-            print(f"Saving merged trajectory for {body.name} with {len(existing_trajectory)} total points")
-            body.set_trajectory(existing_trajectory)
-            body.save()
+        # One short transaction for the whole save, none during the run
+        with transaction.atomic():
+            for body in bodies:
+                # History up to the start time followed by the new samples
+                print(f"Saving merged trajectory for {body.name} with {len(trajectories[body.name])} total points")
+                body.set_trajectory(trajectories[body.name])
+                body.save()
 
     return trajectories
 
@@ -256,4 +289,64 @@ def simulate_quarters(bodies, start_time=0.0):
             )
             current_time = max_time
     
-    return all_trajectories 
\ No newline at end of file
+    return all_trajectories 
+
+def simulate_quarters_parareal(bodies, start_time=0.0, quarters=QUARTERS_TO_SIMULATE, **parareal_options):
+    """
+    Simulate `quarters` consecutive quarters in parallel in time.
+
+    Produces the same trajectories as simulate_quarters, to within the
+    Parareal tolerance, but runs the quarters' fine Verlet integration side
+    by side on a process pool (see orbits.parareal).
+
+    Args:
+        bodies: list of BodyModel objects
+        start_time: starting time in seconds
+        quarters: number of quarters to simulate
+        parareal_options: passed on to orbits.parareal.parareal (coarse_step,
+            tolerance_km, max_iterations, workers)
+
+    Returns:
+        tuple: (combined trajectories by body name, convergence report)
+    """
+    positions = []
+    velocities = []
+    for body in bodies:
+        position, velocity = body.position, body.velocity
+        if body.name != "Sun":
+            position, velocity = get_state_at_time(body, start_time)
+        positions.append(np.asarray(position, dtype=float))
+        velocities.append(np.asarray(velocity, dtype=float))
+
+    specs = [body.snapshot_policy or settings.SNAPSHOT_POLICY or {"mode": "fixed", "interval": SNAPSHOT_INTERVAL}
+             for body in bodies]
+    samples, final_positions, final_velocities, report = parareal(
+        np.array(positions),
+        np.array(velocities),
+        [body.mass for body in bodies],
+        [body.name == "Sun" for body in bodies],
+        G,
+        start_time=start_time,
+        segments=quarters,
+        dt=TIME_STEP,
+        steps_per_segment=STEPS_PER_QUARTER,
+        specs=specs,
+        snapshot_interval=SNAPSHOT_INTERVAL,
+        **parareal_options
+    )
+    print(f"Parareal finished in {len(report['iterations'])} iterations, converged: {report['converged']}")
+
+    all_trajectories = {}
+    with transaction.atomic():
+        for i, body in enumerate(bodies):
+            trajectory = history_until(body, start_time)
+            trajectory[f"{float(start_time)}"] = positions[i].tolist()
+            trajectory.update(samples[i])
+            body.set_trajectory(trajectory)
+            if body.name != "Sun":
+                body.position = final_positions[i]
+                body.velocity = final_velocities[i]
+            body.save()
+            all_trajectories[body.name] = {f"{float(start_time)}": positions[i].tolist(), **samples[i]}
+
+    return all_trajectories, report
@@ -0,0 +1,135 @@
+import numpy as np
+from django.conf import settings
+
+# Defaults for the adaptive policy: chord error allowed between recorded
+# samples, and the longest gap (in steps) even for bodies that barely curve.
+ADAPTIVE_TOLERANCE_KM = 100.0
+ADAPTIVE_MAX_INTERVAL = 520
+
+
+class FixedCadence:
+    """Record every `interval` steps, as the simulation always has."""
+
+    def __init__(self, interval: int):
+        self.interval = max(int(interval), 1)
+
+    def reset(self, start_time: float, dt: float, events=()):
+        pass
+
+    def should_record(self, step: int, time: float, acceleration: np.ndarray) -> bool:
+        return step % self.interval == 0
+
+    def recorded(self, time: float):
+        pass
+
+
+class AdaptiveCadence:
+    """
+    Record when linear interpolation between samples would drift too far.
+
+    Between two samples T seconds apart, a body under acceleration a leaves
+    the straight chord by at most |a| T^2 / 8. A sample is recorded as soon
+    as waiting one more step would push that past `tolerance_km`, so slow,
+    nearly circular orbits are sampled sparsely and tight arcs densely.
+    """
+
+    def __init__(self, tolerance_km: float = ADAPTIVE_TOLERANCE_KM, max_interval: int = ADAPTIVE_MAX_INTERVAL, min_interval: int = 1):
+        if tolerance_km <= 0:
+            raise ValueError("tolerance_km must be positive")
+        self.tolerance_km = tolerance_km
+        self.max_interval = max(int(max_interval), 1)
+        self.min_interval = max(int(min_interval), 1)
+
+    def reset(self, start_time: float, dt: float, events=()):
+        self.dt = dt
+        self.last_time = start_time
+        self.steps_since = 0
+
+    def should_record(self, step: int, time: float, acceleration: np.ndarray) -> bool:
+        self.steps_since += 1
+        if self.steps_since < self.min_interval:
+            return False
+        if self.steps_since >= self.max_interval:
+            return True
+        gap = time - self.last_time + self.dt
+        return np.linalg.norm(acceleration) * gap**2 / 8 > self.tolerance_km
+
+    def recorded(self, time: float):
+        self.last_time = time
+        self.steps_since = 0
+
+
+class WindowedCadence:
+    """
+    High-resolution recording inside time windows, another policy outside.
+
+    Windows are given explicitly and/or opened `around_events` seconds on
+    either side of every burn in the run.
+    """
+
+    def __init__(self, interval: int, outside, windows=(), around_events: float = 0.0):
+        self.interval = max(int(interval), 1)
+        self.outside = outside
+        self.windows = [tuple(window) for window in windows]
+        self.around_events = around_events
+
+    def reset(self, start_time: float, dt: float, events=()):
+        self.active_windows = self.windows + [(t - self.around_events, t + self.around_events) for t in events if self.around_events > 0]
+        self.outside.reset(start_time, dt, events)
+
+    def should_record(self, step: int, time: float, acceleration: np.ndarray) -> bool:
+        if any(start <= time <= end for start, end in self.active_windows):
+            return step % self.interval == 0
+        return self.outside.should_record(step, time, acceleration)
+
+    def recorded(self, time: float):
+        self.outside.recorded(time)
+
+
+def policy_from_spec(spec, default_interval: int):
+    """
+    Build a snapshot policy from its stored description.
+
+    Specs look like {"mode": "fixed", "interval": 52},
+    {"mode": "adaptive", "tolerance_km": 100, "max_interval": 520} or
+    {"mode": "windowed", "interval": 1, "windows": [[t0, t1]],
+     "around_events": 3600, "outside": {...}}. None falls back to
+    settings.SNAPSHOT_POLICY, and without that to a fixed cadence of
+    `default_interval` steps.
+
+    Raises:
+        ValueError: if the spec is not a valid policy
+    """
+    if spec is None:
+        spec = getattr(settings, "SNAPSHOT_POLICY", None)
+    if spec is None:
+        return FixedCadence(default_interval)
+    if not isinstance(spec, dict):
+        raise ValueError("Snapshot policy must be an object")
+    mode = spec.get("mode", "fixed")
+    if mode == "fixed":
+        return FixedCadence(spec.get("interval", default_interval))
+    if mode == "adaptive":
+        return AdaptiveCadence(
+            tolerance_km=float(spec.get("tolerance_km", ADAPTIVE_TOLERANCE_KM)),
+            max_interval=spec.get("max_interval", ADAPTIVE_MAX_INTERVAL),
+            min_interval=spec.get("min_interval", 1)
+        )
+    if mode == "windowed":
+        return WindowedCadence(
+            interval=spec.get("interval", 1),
+            outside=policy_from_spec(spec.get("outside"), default_interval),
+            windows=spec.get("windows", []),
+            around_events=float(spec.get("around_events", 0.0))
+        )
+    raise ValueError(f"Unknown snapshot policy mode: {mode}")
+
+
+def recorders_for(bodies, default_interval: int, start_time: float, dt: float, events=()) -> dict:
+    """Fresh policy state for every body of one simulation run, keyed by name."""
+    recorders = {}
+    for body in bodies:
+        policy = policy_from_spec(body.snapshot_policy, default_interval)
+        policy.reset(start_time, dt, events)
+        recorders[body.name] = policy
+    return recorders
@@ -0,0 +1,302 @@
+import io
+import json
+from pathlib import Path
+
+import numpy as np
+
+# pyarrow is optional and slow to import, so it is loaded by require_arrow
+# on first use rather than when the API boots.
+pa = ds = pq = None
+
+from .ephemeris import trajectory_arrays
+from .models import BodyModel
+
+# Width of the time partitions: one simulated quarter.
+PARTITION_SECONDS = 90 * 24 * 60 * 60
+
+# Rows per record batch / Parquet row group.
+BATCH_ROWS = 65536
+
+TRAJECTORY_COLUMNS = ("body", "time_range", "time", "x", "y", "z", "vx", "vy", "vz")
+BODY_METADATA_KEY = b"orbits.bodies"
+BODIES_FILE = "bodies.json"
+TRAJECTORIES_DIR = "trajectories"
+
+
+def require_arrow():
+    global pa, ds, pq
+    if pa is not None:
+        return
+    try:
+        import pyarrow
+        import pyarrow.dataset
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Arrow export needs pyarrow installed (pip install pyarrow)")
+    pa, ds, pq = pyarrow, pyarrow.dataset, pyarrow.parquet
+
+
+def trajectory_schema():
+    return pa.schema([
+        ("body", pa.string()),
+        ("time_range", pa.int32()),
+        ("time", pa.float64()),
+        ("x", pa.float64()),
+        ("y", pa.float64()),
+        ("z", pa.float64()),
+        ("vx", pa.float64()),
+        ("vy", pa.float64()),
+        ("vz", pa.float64()),
+    ])
+
+
+def body_metadata(body) -> dict:
+    """Mass, state and snapshot policy of a body. Queries its scenario, so call it off the event loop."""
+    return {
+        "name": body.name,
+        "scenario": body.scenario.name if body.scenario_id is not None else None,
+        "mass": body.mass,
+        "position": body.position.tolist(),
+        "velocity": body.velocity.tolist(),
+        "snapshot_policy": body.snapshot_policy,
+        "trajectory_version": body.trajectory_version,
+    }
+
+
+def body_batches(body, start_seconds: float = None, end_seconds: float = None, columns=None):
+    """
+    One body's trajectory as record batches of the trajectory schema.
+
+    Velocities are not stored by the simulation; they are derived from the
+    positions by central differences (the body's velocity when there is a
+    single sample).
+    """
+    require_arrow()
+    times, positions = trajectory_arrays(body)
+    if len(times) > 1:
+        velocities = np.gradient(positions, times, axis=0)
+    else:
+        velocities = np.tile(body.velocity, (len(times), 1))
+
+    lower = 0 if start_seconds is None else np.searchsorted(times, start_seconds, side="left")
+    upper = len(times) if end_seconds is None else np.searchsorted(times, end_seconds, side="right")
+    schema = trajectory_schema()
+    if columns is not None:
+        schema = pa.schema([schema.field(name) for name in columns])
+
+    for offset in range(lower, upper, BATCH_ROWS):
+        stop = min(offset + BATCH_ROWS, upper)
+        window = times[offset:stop]
+        values = {
+            "body": pa.array([body.name] * len(window), pa.string()),
+            "time_range": pa.array(np.floor_divide(window, PARTITION_SECONDS).astype(np.int32)),
+            "time": pa.array(window),
+            "x": pa.array(positions[offset:stop, 0]),
+            "y": pa.array(positions[offset:stop, 1]),
+            "z": pa.array(positions[offset:stop, 2]),
+            "vx": pa.array(velocities[offset:stop, 0]),
+            "vy": pa.array(velocities[offset:stop, 1]),
+            "vz": pa.array(velocities[offset:stop, 2]),
+        }
+        yield pa.record_batch([values[name] for name in schema.names], schema=schema)
+
+
+def _drain(sink: io.BytesIO) -> bytes:
+    data = sink.getvalue()
+    sink.seek(0)
+    sink.truncate()
+    return data
+
+
+def stream_export(bodies, output_format: str = "arrow", start_seconds: float = None, end_seconds: float = None, columns=None):
+    """
+    Generate an Arrow IPC stream or a Parquet file of the bodies' trajectories, chunk by chunk.
+
+    Body metadata (mass, current state, snapshot policy) travels in the
+    schema metadata, so the output alone is enough to seed a scenario with
+    import_bodies. Only one batch is held in memory at a time.
+
+    Args:
+        bodies: BodyModel objects
+        output_format: "arrow" or "parquet"
+        start_seconds, end_seconds: optional time window
+        columns: optional subset of TRAJECTORY_COLUMNS
+
+    Returns:
+        generator of bytes chunks
+
+    Raises:
+        ValueError: for an unknown format or column
+        RuntimeError: if pyarrow is not installed
+    """
+    require_arrow()
+    if columns is not None:
+        unknown = set(columns) - set(TRAJECTORY_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown columns: {', '.join(sorted(unknown))}")
+    schema = trajectory_schema() if columns is None else pa.schema([trajectory_schema().field(name) for name in columns])
+    schema = schema.with_metadata({BODY_METADATA_KEY: json.dumps([body_metadata(body) for body in bodies])})
+
+    if output_format not in ("arrow", "parquet"):
+        raise ValueError(f"Unknown format: {output_format}")
+    # Checked above rather than on first iteration, so errors surface
+    # before a response starts streaming.
+    return _write_stream(bodies, output_format, schema, start_seconds, end_seconds, columns)
+
+
+def _write_stream(bodies, output_format, schema, start_seconds, end_seconds, columns):
+    sink = io.BytesIO()
+    if output_format == "arrow":
+        writer = pa.ipc.new_stream(sink, schema)
+    else:
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+
+    for body in bodies:
+        for batch in body_batches(body, start_seconds, end_seconds, columns):
+            if output_format == "arrow":
+                writer.write_batch(batch)
+            else:
+                writer.write_table(pa.Table.from_batches([batch], schema=schema))
+            yield _drain(sink)
+    writer.close()
+    yield _drain(sink)
+
+
+def export_dataset(bodies, root) -> int:
+    """
+    Write a Parquet dataset for offline analysis.
+
+    Trajectories are hive-partitioned by body and quarter
+    (trajectories/body=Earth/time_range=3/...), so readers filtering on either
+    skip whole files, and row-group statistics on time let them skip the rest.
+    Body metadata goes to bodies.json next to them.
+
+    Returns:
+        int: number of trajectory rows written
+    """
+    require_arrow()
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    rows = 0
+    for body in bodies:
+        batches = list(body_batches(body))
+        if not batches:
+            continue
+        table = pa.Table.from_batches(batches)
+        rows += table.num_rows
+        pq.write_to_dataset(
+            table,
+            root / TRAJECTORIES_DIR,
+            partition_cols=["body", "time_range"],
+            existing_data_behavior="delete_matching",
+            compression="zstd"
+        )
+    (root / BODIES_FILE).write_text(json.dumps([body_metadata(body) for body in bodies]))
+    return rows
+
+
+def read_trajectories(path, bodies=None, start_seconds: float = None, end_seconds: float = None, columns=None):
+    """
+    Read exported trajectories with column pruning and predicate pushdown.
+
+    Works on a dataset directory written by export_dataset and on single
+    Parquet or Arrow IPC files. The body list and time window are pushed
+    down as a filter, which also prunes body and time_range partitions.
+
+    Returns:
+        pyarrow.Table
+    """
+    require_arrow()
+    path = Path(path)
+    if path.is_dir():
+        dataset = ds.dataset(path / TRAJECTORIES_DIR, format="parquet", partitioning="hive")
+    elif _is_arrow_stream(path):
+        dataset = ds.dataset(pa.ipc.open_stream(pa.memory_map(str(path))).read_all())
+    else:
+        dataset = ds.dataset(path, format="parquet")
+
+    condition = None
+
+    def both(left, right):
+        return right if left is None else left & right
+
+    if bodies is not None:
+        condition = both(condition, ds.field("body").isin(list(bodies)))
+    # The time_range bounds are implied by the time ones but let the
+    # dataset skip partitions without opening their files.
+    partitioned = "time_range" in dataset.schema.names
+    if start_seconds is not None:
+        if partitioned:
+            condition = both(condition, ds.field("time_range") >= int(start_seconds // PARTITION_SECONDS))
+        condition = both(condition, ds.field("time") >= start_seconds)
+    if end_seconds is not None:
+        if partitioned:
+            condition = both(condition, ds.field("time_range") <= int(end_seconds // PARTITION_SECONDS))
+        condition = both(condition, ds.field("time") <= end_seconds)
+    return dataset.to_table(columns=columns, filter=condition)
+
+
+def read_body_metadata(path) -> list:
+    """Body metadata stored with an export (bodies.json or the file's schema metadata)."""
+    require_arrow()
+    path = Path(path)
+    if path.is_dir():
+        return json.loads((path / BODIES_FILE).read_text())
+    if _is_arrow_stream(path):
+        schema = pa.ipc.open_stream(pa.memory_map(str(path))).schema
+    else:
+        schema = pq.read_schema(path)
+    metadata = schema.metadata or {}
+    if BODY_METADATA_KEY not in metadata:
+        raise ValueError(f"{path} has no body metadata")
+    return json.loads(metadata[BODY_METADATA_KEY])
+
+
+def _is_arrow_stream(path: Path) -> bool:
+    # IPC streams open with a continuation marker, Parquet files with PAR1.
+    with open(path, "rb") as f:
+        return f.read(4) == b"\xff\xff\xff\xff"
+
+
+def import_bodies(path, scenario=None, replace: bool = False) -> list:
+    """
+    Seed a namespace from an export in one bulk insert.
+
+    Each body's trajectory is grouped from the table, encoded in memory and
+    created with bulk_create together with its state, instead of one save
+    per body and sample. Call inside scenario_write_lock and a transaction.
+
+    Args:
+        path: export written by export_dataset or stream_export
+        scenario: namespace to create the bodies in (None for the default one)
+        replace: delete bodies of the same names first instead of failing
+
+    Returns:
+        list: the created BodyModel objects
+    """
+    metadata = read_body_metadata(path)
+    table = read_trajectories(path, columns=["body", "time", "x", "y", "z"]).sort_by([("body", "ascending"), ("time", "ascending")])
+    names = table.column("body").to_numpy(zero_copy_only=False)
+    times = table.column("time").to_numpy()
+    positions = np.column_stack([table.column(axis).to_numpy() for axis in ("x", "y", "z")])
+    bounds = {}
+    if len(names):
+        starts = np.flatnonzero(np.r_[True, names[1:] != names[:-1]])
+        for start, stop in zip(starts, np.r_[starts[1:], len(names)]):
+            bounds[names[start]] = (start, stop)
+
+    existing = BodyModel.objects.filter(scenario=scenario, name__in=[entry["name"] for entry in metadata])
+    if existing.exists():
+        if not replace:
+            raise ValueError(f"Bodies already exist: {', '.join(sorted(existing.values_list('name', flat=True)))}")
+        existing.delete()
+
+    created = []
+    for entry in metadata:
+        body = BodyModel(scenario=scenario, name=entry["name"], mass=entry["mass"], snapshot_policy=entry.get("snapshot_policy"))
+        body.position = entry["position"]
+        body.velocity = entry["velocity"]
+        start, stop = bounds.get(entry["name"], (0, 0))
+        body.set_trajectory_arrays(times[start:stop], positions[start:stop])
+        created.append(body)
+    return BodyModel.objects.bulk_create(created)
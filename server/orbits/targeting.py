@@ -0,0 +1,217 @@
+import numpy as np
+
+from .twobody import solve_lambert
+from .utils import interpolate_states
+
+# Trial propagations use a coarser step than the full simulation; the
+# converged burn is re-run through nbody_simulation_verlet when committed.
+TARGETING_TIME_STEP = 600.0
+TARGETING_MAX_ITERATIONS = 20
+
+# Relative size of the finite-difference perturbation used for the shooting
+# Jacobian, scaled by the current burn magnitude.
+JACOBIAN_STEP = 1e-6
+
+
+def propagate_test_particles(positions, velocities, start_time: float, end_time: float,
+                             perturbers: list, G: float, dt: float = TARGETING_TIME_STEP,
+                             record_every: int = None) -> dict:
+    """
+    Propagate a batch of massless trial states through the stored ephemerides.
+
+    The trial states feel the gravity of every perturber, whose positions are
+    taken from their stored trajectories rather than re-simulated, so many
+    trial burns can be advanced together in one velocity Verlet loop.
+
+    Args:
+        positions: initial positions in km, shape (k, 3)
+        velocities: initial velocities in km/s, shape (k, 3)
+        start_time: start of the propagation (in seconds from reference date)
+        end_time: end of the propagation (in seconds from reference date)
+        perturbers: list of (mass, times, positions) tuples
+        G: gravitational constant in km^3/(kg·s^2)
+        dt: time step in seconds
+        record_every: if given, record positions every `record_every` steps
+
+    Returns:
+        dict: "times", "positions" of shape (steps + 1, k, 3) when recorded,
+              and the final "position"/"velocity" of every trial
+
+    Raises:
+        ValueError: if [start_time, end_time] is not covered by every
+            perturber's stored trajectory
+    """
+    for _, times, _ in perturbers:
+        # Interpolation would silently hold the perturber at its end sample.
+        if len(times) < 2 or start_time < times[0] or end_time > times[-1]:
+            raise ValueError("Burn and arrival times fall outside the stored trajectories; simulate further first")
+
+    steps = max(int(np.ceil((end_time - start_time) / dt)), 1)
+    dt = (end_time - start_time) / steps
+    step_times = start_time + dt * np.arange(steps + 1)
+
+    masses = np.array([mass for mass, _, _ in perturbers], dtype=float)
+    # Sample every perturber on the step grid once, shape (steps + 1, m, 3).
+    sources = np.stack([interpolate_states(times, body_positions, step_times)[0]
+                        for _, times, body_positions in perturbers], axis=1)
+
+    def accelerations(x, step):
+        separation = sources[step][None, :, :] - x[:, None, :]
+        distance = np.linalg.norm(separation, axis=-1)
+        return G * np.einsum("m,kmi->ki", masses, separation / distance[..., None]**3)
+
+    x = np.array(positions, dtype=float)
+    v = np.array(velocities, dtype=float)
+    a = accelerations(x, 0)
+
+    recorded_steps = []
+    recorded = []
+    if record_every:
+        recorded_steps.append(0)
+        recorded.append(x.copy())
+
+    for step in range(1, steps + 1):
+        x = x + v * dt + 0.5 * a * dt**2
+        new_a = accelerations(x, step)
+        v = v + 0.5 * (a + new_a) * dt
+        a = new_a
+        if record_every and (step % record_every == 0 or step == steps):
+            recorded_steps.append(step)
+            recorded.append(x.copy())
+
+    result = {"position": x, "velocity": v}
+    if record_every:
+        result["times"] = step_times[recorded_steps]
+        result["positions"] = np.stack(recorded)
+    return result
+
+
+def _closest_distances(particle_positions, target_positions):
+    """Minimum distance over time for every trial, shapes (steps, k, 3) and (steps, 3)."""
+    return np.linalg.norm(particle_positions - target_positions[:, None, :], axis=-1).min(axis=0)
+
+
+def solve_burn(position, velocity, burn_time: float, arrival_time: float, perturbers: list, G: float,
+               target_position=None, target_ephemeris: tuple = None, minimize_distance: bool = False,
+               central_mu: float = None, central_position=None, tolerance_km: float = 1000.0,
+               dt: float = TARGETING_TIME_STEP) -> dict:
+    """
+    Solve for the delta-v that takes a body to a goal.
+
+    Goals:
+        - reach `target_position` at `arrival_time`
+        - reach the body described by `target_ephemeris` at `arrival_time`
+        - with `minimize_distance`, get as close as possible to the body in
+          `target_ephemeris` at any time before `arrival_time`
+
+    The first two goals use a shooting method: each iteration propagates the
+    current guess together with three perturbed burns as one batch, builds a
+    finite-difference Jacobian of the arrival position and takes a damped
+    Newton step. The initial guess is the two-body Lambert transfer about
+    `central_mu`. Minimizing distance uses a derivative-free compass search
+    whose trial burns are also propagated as a single batch.
+
+    Args:
+        position: position of the body at the burn in km
+        velocity: velocity of the body just before the burn in km/s
+        burn_time: time of the burn (in seconds from reference date)
+        arrival_time: time by which the goal must be met
+        perturbers: list of (mass, times, positions) tuples for every other body
+        G: gravitational constant in km^3/(kg·s^2)
+        central_mu: gravitational parameter used for the Lambert initial guess
+        central_position: (times, positions) of the central body for the initial guess
+        tolerance_km: miss distance at which the position goals count as met
+        dt: trial propagation time step in seconds
+
+    Returns:
+        dict: "delta_velocity", "miss_distance_km", "iterations", "converged"
+              and "closest_approach_time" for the minimize goal
+    """
+    position = np.asarray(position, dtype=float)
+    velocity = np.asarray(velocity, dtype=float)
+
+    if minimize_distance:
+        return _minimize_distance(position, velocity, burn_time, arrival_time, perturbers, G,
+                                  target_ephemeris, tolerance_km, dt)
+
+    if target_position is None:
+        target_position = interpolate_states(*target_ephemeris, [arrival_time])[0][0]
+    target_position = np.asarray(target_position, dtype=float)
+
+    delta_v = np.zeros(3)
+    if central_mu is not None:
+        center_start = interpolate_states(*central_position, [burn_time])[0][0]
+        center_end = interpolate_states(*central_position, [arrival_time])[0][0]
+        transfer_v, _ = solve_lambert(position - center_start, target_position - center_end,
+                                      arrival_time - burn_time, central_mu)
+        if np.all(np.isfinite(transfer_v)):
+            delta_v = transfer_v - velocity
+
+    miss = np.inf
+    for iteration in range(1, TARGETING_MAX_ITERATIONS + 1):
+        step = JACOBIAN_STEP * max(np.linalg.norm(velocity + delta_v), 1.0)
+        trials = np.vstack([delta_v, delta_v + step * np.eye(3)])
+        arrival = propagate_test_particles(
+            np.repeat(position[None, :], 4, axis=0), velocity + trials,
+            burn_time, arrival_time, perturbers, G, dt
+        )["position"]
+
+        error = arrival[0] - target_position
+        miss = float(np.linalg.norm(error))
+        if miss <= tolerance_km:
+            return {"delta_velocity": delta_v, "miss_distance_km": miss, "iterations": iteration, "converged": True}
+
+        jacobian = (arrival[1:] - arrival[0]).T / step
+        try:
+            correction = np.linalg.solve(jacobian, -error)
+        except np.linalg.LinAlgError:
+            break
+        # Keep each Newton step within a fraction of the current speed.
+        limit = 0.5 * max(np.linalg.norm(velocity + delta_v), 1.0)
+        norm = np.linalg.norm(correction)
+        if norm > limit:
+            correction *= limit / norm
+        delta_v = delta_v + correction
+
+    return {"delta_velocity": delta_v, "miss_distance_km": miss, "iterations": TARGETING_MAX_ITERATIONS, "converged": False}
+
+
+def _minimize_distance(position, velocity, burn_time, arrival_time, perturbers, G, target_ephemeris, tolerance_km, dt):
+    directions = np.vstack([np.zeros(3), np.eye(3), -np.eye(3)])
+    delta_v = np.zeros(3)
+    step = 0.05 * max(np.linalg.norm(velocity), 1.0)
+    best = np.inf
+    best_index = 0
+    best_time = None
+
+    for iteration in range(1, 4 * TARGETING_MAX_ITERATIONS + 1):
+        trials = delta_v + step * directions
+        result = propagate_test_particles(
+            np.repeat(position[None, :], len(trials), axis=0), velocity + trials,
+            burn_time, arrival_time, perturbers, G, dt, record_every=1
+        )
+        target = interpolate_states(*target_ephemeris, result["times"])[0]
+        distances = _closest_distances(result["positions"], target)
+
+        candidate = int(np.argmin(distances))
+        if distances[candidate] < best:
+            best = float(distances[candidate])
+            best_index = int(np.argmin(np.linalg.norm(result["positions"][:, candidate] - target, axis=-1)))
+            best_time = float(result["times"][best_index])
+            delta_v = trials[candidate]
+        if candidate == 0:
+            step *= 0.5
+        if best <= tolerance_km or step < 1e-7:
+            break
+
+    if best_time is None:
+        raise ValueError("No finite distance to the target along the trial trajectories")
+
+    return {
+        "delta_velocity": delta_v,
+        "miss_distance_km": best,
+        "closest_approach_time": best_time,
+        "iterations": iteration,
+        # A collapsed step only means the search stalled, not that it hit.
+        "converged": bool(best <= tolerance_km),
+    }
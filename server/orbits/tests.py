@@ -1,3 +1,125 @@
 from django.test import TestCase
 
-# Create your tests here.
+import numpy as np
+
+from orbits.models import BodyModel, resolve_bodies
+from orbits.patched_conics import Attractor, patched_conic_preview
+from orbits.scenarios import fork_scenario, own_bodies, scenario_bodies
+from orbits.simulation import G, nbody_simulation_verlet
+
+
+SUN_MASS = 1.989e30
+
+
+def seed_bodies(snapshot_policy):
+    """Sun, Earth and Mars on circular orbits, simulated for two weeks."""
+    bodies = [BodyModel(name="Sun", mass=SUN_MASS, snapshot_policy=snapshot_policy)]
+    bodies[0].position = [0, 0, 0]
+    bodies[0].velocity = [0, 0, 0]
+    for name, mass, radius in (("Earth", 5.972e24, 1.496e8), ("Mars", 6.39e23, 2.279e8)):
+        body = BodyModel(name=name, mass=mass, snapshot_policy=snapshot_policy)
+        body.position = [radius, 0, 0]
+        body.velocity = [0, np.sqrt(G * SUN_MASS / radius), 0]
+        bodies.append(body)
+    for body in bodies:
+        body.save()
+    nbody_simulation_verlet(bodies, dt=600.0, steps=2000, snapshot_interval=52)
+    return bodies
+
+
+class ManeuverResimulationTests(TestCase):
+    """A maneuver replaces every stored sample after its time, whatever the snapshot policy."""
+
+    BURN_TIME = 400 * 600.0
+    STEPS = 500
+
+    def assert_replaced(self, scenario, returned):
+        for name in returned:
+            times, positions = resolve_bodies(scenario, [name])[name].get_trajectory_arrays()
+            self.assertTrue(np.any(times < self.BURN_TIME))
+            # Nothing left over from the longer run before the maneuver...
+            self.assertLessEqual(times[-1], self.BURN_TIME + self.STEPS * 600.0)
+            # ...nor interleaved with the new samples: the old and new paths
+            # diverge, so mixed samples imply speeds no body has.
+            after = times >= self.BURN_TIME
+            speeds = np.linalg.norm(np.diff(positions[after], axis=0), axis=1) / np.diff(times[after])
+            self.assertLess(speeds.max(), 40.0)
+
+    def maneuver(self, bodies, steps=STEPS):
+        return nbody_simulation_verlet(
+            bodies,
+            dt=600.0,
+            steps=steps,
+            snapshot_interval=52,
+            start_time=self.BURN_TIME,
+            burns=[(self.BURN_TIME, "Mars", [0.0, 2.0, 0.0])]
+        )
+
+    def test_adaptive_policy(self):
+        bodies = seed_bodies({"mode": "adaptive", "tolerance_km": 100})
+        self.assert_replaced(None, self.maneuver(bodies))
+
+    def test_windowed_policy(self):
+        bodies = seed_bodies({"mode": "windowed", "interval": 1, "around_events": 3600, "outside": {"mode": "adaptive"}})
+        self.assert_replaced(None, self.maneuver(bodies))
+
+    def test_adaptive_policy_in_fork(self):
+        seed_bodies({"mode": "adaptive", "tolerance_km": 100})
+        scenario = fork_scenario("maneuvered")
+        bodies = own_bodies(scenario, scenario_bodies(scenario), self.BURN_TIME)
+        # A longer first run gives the fork's own rows samples to replace.
+        self.maneuver(bodies, steps=1500)
+        bodies = own_bodies(scenario, scenario_bodies(scenario), self.BURN_TIME)
+        self.assert_replaced(scenario, self.maneuver(bodies))
+        # The parent keeps its own samples.
+        self.assertGreater(
+            max(float(t) for t in resolve_bodies(None, ["Mars"])["Mars"].get_trajectory()),
+            self.BURN_TIME
+        )
+
+
+def kepler_radius(rp: float, e: float, mu: float, offsets) -> np.ndarray:
+    """Distance from the focus on an ellipse starting at periapsis, from Kepler's equation."""
+    a = rp / (1 - e)
+    mean_anomaly = np.sqrt(mu / a**3) * np.asarray(offsets) % (2 * np.pi)
+    eccentric_anomaly = np.full_like(mean_anomaly, np.pi)
+    for _ in range(100):
+        eccentric_anomaly -= (eccentric_anomaly - e * np.sin(eccentric_anomaly) - mean_anomaly) / (1 - e * np.cos(eccentric_anomaly))
+    return a * (1 - e * np.cos(eccentric_anomaly))
+
+
+class PatchedConicPreviewTests(TestCase):
+    """Previews of burns from low Earth orbit, with the Sun and Earth held fixed."""
+
+    EARTH_MASS = 5.972e24
+    EARTH_POSITION = np.array([1.496e8, 0.0, 0.0])
+    PERIAPSIS = 6678.0
+    HOURS = 720
+
+    def preview(self, eccentricity: float):
+        mu = G * self.EARTH_MASS
+        attractors = [
+            Attractor("Sun", SUN_MASS, np.empty(0), np.empty((0, 3)), position=np.zeros(3)),
+            Attractor("Earth", self.EARTH_MASS, np.empty(0), np.empty((0, 3)), position=self.EARTH_POSITION),
+        ]
+        speed = np.sqrt(mu * (1 + eccentricity) / self.PERIAPSIS)
+        query_times = np.arange(0.0, self.HOURS * 3600.0 + 1, 600.0)
+        preview = patched_conic_preview(
+            self.EARTH_POSITION + [self.PERIAPSIS, 0.0, 0.0],
+            [0.0, speed, 0.0],
+            0.0,
+            query_times,
+            attractors,
+            G
+        )
+        return preview, kepler_radius(self.PERIAPSIS, eccentricity, mu, query_times)
+
+    def test_bound_orbits_stay_with_earth(self):
+        # Up to apoapses just inside Earth's sphere of influence, where an
+        # unguarded Kepler solve diverged and faked an exit.
+        for eccentricity in (0.5, 0.9, 0.975, 0.98):
+            with self.subTest(eccentricity=eccentricity):
+                preview, expected = self.preview(eccentricity)
+                self.assertEqual([segment[0] for segment in preview["segments"]], ["Earth"])
+                radius = np.linalg.norm(preview["positions"] - self.EARTH_POSITION, axis=1)
+                np.testing.assert_allclose(radius, expected, rtol=1e-6)
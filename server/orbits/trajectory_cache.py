@@ -0,0 +1,110 @@
+import os
+import threading
+from collections import OrderedDict
+
+# Upper bound on the decoded trajectory arrays kept per process.
+TRAJECTORY_CACHE_BYTES = int(os.getenv("TRAJECTORY_CACHE_BYTES", str(256 * 1024 * 1024)))
+
+
+def _cache_key(body) -> tuple:
+    # A fork copy's arrays include samples inherited from its base bodies,
+    # so every row in the chain contributes its version. The write time
+    # tells apart a deleted row and a new one that got its primary key.
+    key = []
+    while body is not None:
+        key.append((body.pk, body.trajectory_version, body.trajectory_updated_at, body.base_time))
+        body = body.base_body()
+    return tuple(key)
+
+
+class TrajectoryCache:
+    """
+    Byte-bounded LRU of decoded trajectories as (times, positions) arrays.
+
+    Entries are keyed by body and trajectory_version, so a rewritten
+    trajectory is never served stale, even one written by another process.
+    Writes in this process also drop the body's entries straight away
+    (invalidate) instead of leaving them to age out. The arrays are shared
+    between callers and marked read-only.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._keys_by_body = {}
+        self._lock = threading.Lock()
+
+    def arrays(self, body) -> tuple:
+        """Time-sorted (times, positions) of a body, decoded at most once per version."""
+        if body.pk is None:
+            return body.get_trajectory_arrays()
+        key = _cache_key(body)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        times, positions = body.get_trajectory_arrays()
+        times.setflags(write=False)
+        positions.setflags(write=False)
+        self._put(key, (times, positions))
+        return times, positions
+
+    def _put(self, key: tuple, entry: tuple):
+        size = entry[0].nbytes + entry[1].nbytes
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = entry
+            self.size += size
+            for pk, *_ in key:
+                self._keys_by_body.setdefault(pk, set()).add(key)
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key: tuple) -> bool:
+        # Called with the lock held.
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self.size -= entry[0].nbytes + entry[1].nbytes
+        for pk, *_ in key:
+            keys = self._keys_by_body.get(pk)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_body[pk]
+        return True
+
+    def invalidate(self, pk):
+        """Drop every entry built from the body with primary key `pk`."""
+        with self._lock:
+            for key in list(self._keys_by_body.get(pk, ())):
+                if self._remove(key):
+                    self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+trajectory_cache = TrajectoryCache(TRAJECTORY_CACHE_BYTES)
@@ -0,0 +1,346 @@
+import numpy as np
+
+# Below this |z| the Stumpff functions switch to their series expansions to
+# avoid cancellation in (1 - cos) and (sinh - x).
+STUMPFF_SERIES_LIMIT = 1e-3
+
+LAMBERT_ITERATIONS = 64
+LAMBERT_TOLERANCE = 1e-12
+
+
+def stumpff(z):
+    """
+    Stumpff functions C(z) and S(z), vectorized over z.
+
+    Returns:
+        tuple: (C, S) with the same shape as z
+    """
+    z = np.asarray(z, dtype=float)
+    positive = z > 0
+    root = np.sqrt(np.abs(z))
+    safe_root = np.where(root > 0, root, 1.0)
+    with np.errstate(invalid="ignore", over="ignore"):
+        c = np.where(positive, 1.0 - np.cos(root), np.cosh(root) - 1.0) / safe_root**2
+        s = np.where(positive, root - np.sin(root), np.sinh(root) - root) / safe_root**3
+    series = np.abs(z) < STUMPFF_SERIES_LIMIT
+    c = np.where(series, 0.5 - z / 24.0 + z**2 / 720.0, c)
+    s = np.where(series, 1.0 / 6.0 - z / 120.0 + z**2 / 5040.0, s)
+    return c, s
+
+
+def solve_lambert(r1, r2, tof, mu: float, prograde: bool = True):
+    """
+    Batched zero-revolution Lambert solver using universal variables.
+
+    Every row is an independent problem and all rows are iterated together,
+    so a whole departure/arrival grid is solved in a handful of NumPy passes.
+
+    Args:
+        r1: departure positions in km, shape (n, 3)
+        r2: arrival positions in km, shape (n, 3)
+        tof: times of flight in seconds, shape (n,)
+        mu: gravitational parameter of the central body in km^3/s^2
+        prograde: solve for the prograde (counter-clockwise about +z) transfer
+
+    Returns:
+        tuple: (v1, v2) transfer velocities in km/s, shape (n, 3);
+               rows without a solution are NaN
+    """
+    r1 = np.asarray(r1, dtype=float)
+    r2 = np.asarray(r2, dtype=float)
+    tof = np.asarray(tof, dtype=float)
+
+    r1_norm = np.linalg.norm(r1, axis=-1)
+    r2_norm = np.linalg.norm(r2, axis=-1)
+    cos_dtheta = np.clip(np.einsum("...i,...i->...", r1, r2) / (r1_norm * r2_norm), -1.0, 1.0)
+    dtheta = np.arccos(cos_dtheta)
+    cross_z = np.cross(r1, r2)[..., 2]
+    long_way = cross_z < 0 if prograde else cross_z >= 0
+    dtheta = np.where(long_way, 2 * np.pi - dtheta, dtheta)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        A = np.sin(dtheta) * np.sqrt(r1_norm * r2_norm / (1.0 - cos_dtheta))
+    sqrt_mu_tof = np.sqrt(mu) * tof
+
+    def y_of(z, C, S, rows):
+        return r1_norm[rows] + r2_norm[rows] + A[rows] * (z * S - 1.0) / np.sqrt(C)
+
+    def residual(z, rows):
+        C, S = stumpff(z)
+        y = y_of(z, C, S, rows)
+        with np.errstate(invalid="ignore"):
+            value = (y / C) ** 1.5 * S + A[rows] * np.sqrt(y) - sqrt_mu_tof[rows]
+        # y < 0 only happens below the root, so treat it as "too short".
+        return np.where(y < 0, -np.inf, value), y, C, S
+
+    def slope(z, y, C, S, rows):
+        a = A[rows]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            general = (y / C) ** 1.5 * ((C - 1.5 * S / C) / (2 * z) + 0.75 * S**2 / C) \
+                + a / 8 * (3 * S / C * np.sqrt(y) + a * np.sqrt(C / y))
+            at_zero = np.sqrt(2) / 40 * y**1.5 + a / 8 * (np.sqrt(y) + a * np.sqrt(0.5 / y))
+        return np.where(np.abs(z) < STUMPFF_SERIES_LIMIT, at_zero, general)
+
+    A = np.atleast_1d(A).ravel()
+    r1_norm = np.atleast_1d(r1_norm).ravel()
+    r2_norm = np.atleast_1d(r2_norm).ravel()
+    sqrt_mu_tof = np.broadcast_to(sqrt_mu_tof, tof.shape).ravel()
+    every_row = np.arange(A.size)
+
+    upper = np.full(A.size, 4 * np.pi**2 - 1e-9)
+    lower = np.full(A.size, -4 * np.pi**2)
+    # Fast hyperbolic transfers need z well below -4 pi^2; widen until bracketed.
+    for _ in range(20):
+        too_high = residual(lower, every_row)[0] > 0
+        if not np.any(too_high):
+            break
+        lower = np.where(too_high, lower * 2, lower)
+
+    # Newton's method, falling back to bisection whenever a step would
+    # leave the bracket that still contains the root. Converged rows drop
+    # out of the working set so stragglers do not keep the whole grid busy.
+    z = np.clip(np.zeros(A.size), lower, upper)
+    rows = every_row[np.isfinite(A)]
+    for _ in range(LAMBERT_ITERATIONS):
+        if not len(rows):
+            break
+        z_rows, lower_rows, upper_rows = z[rows], lower[rows], upper[rows]
+        value, y, C, S = residual(z_rows, rows)
+        above = value > 0
+        upper_rows = np.where(above, z_rows, upper_rows)
+        lower_rows = np.where(above, lower_rows, z_rows)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            newton = z_rows - value / slope(z_rows, y, C, S, rows)
+        inside = np.isfinite(newton) & (newton > lower_rows) & (newton < upper_rows)
+        z_next = np.where(inside, newton, 0.5 * (lower_rows + upper_rows))
+
+        z[rows], lower[rows], upper[rows] = z_next, lower_rows, upper_rows
+        moving = np.abs(z_next - z_rows) > LAMBERT_TOLERANCE * np.maximum(1.0, np.abs(z_rows))
+        rows = rows[moving]
+
+    z = z.reshape(tof.shape)
+    A = A.reshape(tof.shape)
+    r1_norm = r1_norm.reshape(tof.shape)
+    r2_norm = r2_norm.reshape(tof.shape)
+    C, S = stumpff(z)
+    y = r1_norm + r2_norm + A * (z * S - 1.0) / np.sqrt(C)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        f = 1.0 - y / r1_norm
+        g = A * np.sqrt(y / mu)
+        g_dot = 1.0 - y / r2_norm
+        v1 = (r2 - f[..., None] * r1) / g[..., None]
+        v2 = (g_dot[..., None] * r2 - r1) / g[..., None]
+
+    invalid = ~np.isfinite(A) | (tof <= 0) | (y < 0)
+    v1[invalid] = np.nan
+    v2[invalid] = np.nan
+    return v1, v2
+
+
+KEPLER_ITERATIONS = 100
+KEPLER_TOLERANCE = 1e-10
+
+# Doublings allowed while widening the bracket on chi for open orbits.
+KEPLER_BRACKET_DOUBLINGS = 60
+
+
+def propagate_kepler(r0, v0, mu: float, dt) -> tuple:
+    """
+    Analytic two-body propagation using the universal-variable formulation.
+
+    Every body is evaluated at every time offset in one pass, so the cost is
+    a few dozen NumPy operations regardless of how many states are requested.
+    Elliptic, parabolic and hyperbolic orbits are handled alike, and negative
+    offsets propagate backwards.
+
+    Elliptic offsets are first reduced to within half a period, since whole
+    periods bring the state back. Kepler's equation is increasing in chi, so
+    the root is bracketed and solved with Newton's method, falling back to
+    bisection whenever a step would leave the bracket, as solve_lambert
+    does; this keeps highly eccentric orbits from diverging.
+
+    Args:
+        r0: positions relative to the central body in km, shape (n, 3)
+        v0: velocities relative to the central body in km/s, shape (n, 3)
+        mu: gravitational parameter of the central body in km^3/s^2
+        dt: time offsets in seconds, shape (m,) shared by all bodies or (n, m)
+
+    Returns:
+        tuple: (positions, velocities) with shape (n, m, 3); states whose
+               solve did not converge are NaN
+    """
+    r0 = np.atleast_2d(np.asarray(r0, dtype=float))
+    v0 = np.atleast_2d(np.asarray(v0, dtype=float))
+    n = len(r0)
+    dt = np.broadcast_to(np.asarray(dt, dtype=float), (n, np.shape(dt)[-1] if np.ndim(dt) else 1))
+
+    sqrt_mu = np.sqrt(mu)
+    r0_norm = np.linalg.norm(r0, axis=1)[:, None]
+    vr0 = (np.einsum("ij,ij->i", r0, v0)[:, None]) / r0_norm
+    alpha = 2.0 / r0_norm - np.einsum("ij,ij->i", v0, v0)[:, None] / mu
+
+    r0_norm, vr0, alpha = (np.broadcast_to(x, dt.shape).ravel() for x in (r0_norm, vr0, alpha))
+    flat_dt = dt.ravel().copy()
+
+    elliptic = alpha > 1e-12
+    with np.errstate(divide="ignore", invalid="ignore"):
+        period = np.where(elliptic, 2 * np.pi / (sqrt_mu * np.abs(alpha)**1.5), np.inf)
+        flat_dt = np.where(elliptic, flat_dt - period * np.round(flat_dt / period), flat_dt)
+
+    def kepler_equation(chi, rows):
+        z = alpha[rows] * chi**2
+        C, S = stumpff(z)
+        a, r, v = alpha[rows], r0_norm[rows], vr0[rows]
+        with np.errstate(invalid="ignore", over="ignore"):
+            value = r * v / sqrt_mu * chi**2 * C + (1 - a * r) * chi**3 * S + r * chi - sqrt_mu * flat_dt[rows]
+            slope = r * v / sqrt_mu * chi * (1 - z * S) + (1 - a * r) * chi**2 * C + r
+        return value, slope
+
+    # Standard starting guess, exact for circular orbits; hyperbolic orbits
+    # use Vallado's logarithmic guess so Newton does not overshoot.
+    chi = sqrt_mu * np.abs(alpha) * flat_dt
+    hyperbolic = alpha < -1e-12
+    if np.any(hyperbolic):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            a = 1.0 / alpha
+            sign = np.sign(flat_dt)
+            guess = sign * np.sqrt(-a) * np.log(
+                (-2 * mu * alpha * flat_dt)
+                / (r0_norm * vr0 + sign * np.sqrt(-mu * a) * (1 - r0_norm * alpha))
+            )
+        chi = np.where(hyperbolic & np.isfinite(guess), guess, chi)
+
+    # The root has the sign of dt. Within half a period an ellipse's
+    # eccentric anomaly changes by less than 2 pi, so chi stays below
+    # 2 pi / sqrt(alpha); open orbits widen the bracket until it holds.
+    every_row = np.arange(len(chi))
+    forward = flat_dt >= 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        reach = np.where(elliptic, 2 * np.pi / np.sqrt(np.abs(alpha)), np.maximum(np.abs(chi), sqrt_mu * np.abs(flat_dt) / r0_norm))
+    reach = np.where(np.isfinite(reach) & (reach > 0), reach, 1.0)
+    for _ in range(KEPLER_BRACKET_DOUBLINGS):
+        value = kepler_equation(np.where(forward, reach, -reach), every_row)[0]
+        short = np.where(forward, value < 0, value > 0)
+        if not np.any(short):
+            break
+        reach = np.where(short, reach * 2, reach)
+    lower = np.where(forward, 0.0, -reach)
+    upper = np.where(forward, reach, 0.0)
+
+    chi = np.clip(np.where(np.isfinite(chi), chi, 0.0), lower, upper)
+    rows = every_row
+    for _ in range(KEPLER_ITERATIONS):
+        if not len(rows):
+            break
+        chi_rows, lower_rows, upper_rows = chi[rows], lower[rows], upper[rows]
+        value, slope = kepler_equation(chi_rows, rows)
+        above = value > 0
+        upper_rows = np.where(above, chi_rows, upper_rows)
+        lower_rows = np.where(above, lower_rows, chi_rows)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            newton = chi_rows - value / slope
+        inside = np.isfinite(newton) & (newton >= lower_rows) & (newton <= upper_rows)
+        chi_next = np.where(inside, newton, 0.5 * (lower_rows + upper_rows))
+
+        chi[rows], lower[rows], upper[rows] = chi_next, lower_rows, upper_rows
+        moving = np.abs(chi_next - chi_rows) > KEPLER_TOLERANCE * np.maximum(1.0, np.abs(chi_rows))
+        rows = rows[moving]
+    # Rows still moving after every iteration did not converge.
+    chi[rows] = np.nan
+
+    z = alpha * chi**2
+    C, S = stumpff(z)
+    f = 1 - chi**2 / r0_norm * C
+    g = flat_dt - chi**3 * S / sqrt_mu
+
+    shape = dt.shape
+    f, g = f.reshape(shape), g.reshape(shape)
+    positions = f[..., None] * r0[:, None, :] + g[..., None] * v0[:, None, :]
+    r_norm = np.linalg.norm(positions, axis=-1)
+
+    chi, z, C, S = (x.reshape(shape) for x in (chi, z, C, S))
+    f_dot = sqrt_mu / (r_norm * r0_norm.reshape(shape)) * (z * S - 1) * chi
+    g_dot = 1 - chi**2 / r_norm * C
+    velocities = f_dot[..., None] * r0[:, None, :] + g_dot[..., None] * v0[:, None, :]
+    return positions, velocities
+
+
+def state_to_elements(r, v, mu: float, tol: float = 1e-8) -> dict:
+    """
+    Classical orbital elements for a batch of state vectors.
+
+    Follows the same conventions as poliastro's rv2coe, including its
+    handling of circular and equatorial orbits: RAAN is zero for equatorial
+    orbits, the argument of periapsis is zero for circular ones, and the true
+    anomaly then becomes the longitude of periapsis, argument of latitude or
+    true longitude respectively. The true anomaly is wrapped to [-pi, pi).
+
+    Args:
+        r: positions relative to the attractor in km, shape (n, 3)
+        v: velocities relative to the attractor in km/s, shape (n, 3)
+        mu: gravitational parameter of the attractor in km^3/s^2
+        tol: threshold below which eccentricity/inclination count as zero
+
+    Returns:
+        dict: arrays of shape (n,) for "p" and "a" in km, "ecc", and "inc",
+              "raan", "argp", "nu" in radians
+    """
+    r = np.atleast_2d(np.asarray(r, dtype=float))
+    v = np.atleast_2d(np.asarray(v, dtype=float))
+
+    def dot(x, y):
+        return np.einsum("ij,ij->i", x, y)
+
+    r_norm = np.linalg.norm(r, axis=1)
+    h = np.cross(r, v)
+    h_norm = np.linalg.norm(h, axis=1)
+    n = np.cross([0.0, 0.0, 1.0], h)
+    e_vec = ((dot(v, v) - mu / r_norm)[:, None] * r - dot(r, v)[:, None] * v) / mu
+    ecc = np.linalg.norm(e_vec, axis=1)
+    p = h_norm**2 / mu
+    inc = np.arccos(np.clip(h[:, 2] / h_norm, -1.0, 1.0))
+
+    circular = ecc < tol
+    equatorial = np.abs(inc) < tol
+    two_pi = 2 * np.pi
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        a = p / (1 - ecc**2)
+
+        # General case: anomaly from the eccentric or hyperbolic anomaly.
+        ka = mu * a
+        e_cos = r_norm * dot(v, v) / mu - 1
+        eccentric_anomaly = np.arctan2(dot(r, v) / np.sqrt(ka), e_cos)
+        elliptic_nu = 2 * np.arctan(np.sqrt((1 + ecc) / (1 - ecc)) * np.tan(eccentric_anomaly / 2))
+        e_sinh = dot(r, v) / np.sqrt(-ka)
+        hyperbolic_anomaly = np.log((e_cos + e_sinh) / (e_cos - e_sinh)) / 2
+        hyperbolic_nu = 2 * np.arctan(np.sqrt((ecc + 1) / (ecc - 1)) * np.tanh(hyperbolic_anomaly / 2))
+        general_nu = np.where(a > 0, elliptic_nu, hyperbolic_nu)
+
+        node_raan = np.arctan2(n[:, 1], n[:, 0]) % two_pi
+        px = dot(r, n)
+        py = dot(r, np.cross(h, n)) / h_norm
+        general_argp = (np.arctan2(py, px) - general_nu) % two_pi
+
+        # Equatorial, elliptical: argp is the longitude of periapsis.
+        equatorial_argp = np.arctan2(e_vec[:, 1], e_vec[:, 0]) % two_pi
+        equatorial_nu = np.arctan2(dot(h, np.cross(e_vec, r)) / h_norm, dot(r, e_vec))
+        # Inclined, circular: nu is the argument of latitude.
+        circular_nu = np.arctan2(dot(r, np.cross(h, n)) / h_norm, dot(r, n))
+        # Equatorial and circular: nu is the true longitude.
+        true_longitude = np.arctan2(r[:, 1], r[:, 0]) % two_pi
+
+    raan = np.where(equatorial, 0.0, node_raan)
+    argp = np.select(
+        [equatorial & ~circular, ~equatorial & circular, equatorial & circular],
+        [equatorial_argp, 0.0, 0.0],
+        default=general_argp,
+    )
+    nu = np.select(
+        [equatorial & ~circular, ~equatorial & circular, equatorial & circular],
+        [equatorial_nu, circular_nu, true_longitude],
+        default=general_nu,
+    )
+    nu = (nu + np.pi) % two_pi - np.pi
+
+    return {"p": p, "a": a, "ecc": ecc, "inc": inc, "raan": raan, "argp": argp, "nu": nu}
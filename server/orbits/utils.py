@@ -1,4 +1,5 @@
 from datetime import datetime, timedelta
+import numpy as np
 import pytz
 
 # Reference date: January 1st, 2010 00:00:00 UTC
@@ -87,4 +88,64 @@ def get_trajectory_between_dates(trajectory_dict: dict, start_date: str, end_dat
             filtered_trajectory[timestamp] = position
             
     print(f"Points after filtering: {len(filtered_trajectory)}")
-    return filtered_trajectory 
\ No newline at end of file
+    return filtered_trajectory
+
+def trajectory_to_arrays(trajectory_dict: dict) -> tuple:
+    """
+    Convert a trajectory dictionary into time-sorted NumPy arrays.
+    
+    Args:
+        trajectory_dict: Dictionary containing trajectory data with timestamps as keys
+        
+    Returns:
+        tuple: (times, positions) with shapes (n,) and (n, 3)
+    """
+    if not trajectory_dict:
+        return np.empty(0), np.empty((0, 3))
+    
+    times = np.fromiter((float(t) for t in trajectory_dict.keys()), dtype=float, count=len(trajectory_dict))
+    positions = np.array(list(trajectory_dict.values()), dtype=float).reshape(-1, 3)
+    
+    order = np.argsort(times, kind="stable")
+    return times[order], positions[order]
+
+def interpolate_states(times: np.ndarray, positions: np.ndarray, query_times) -> tuple:
+    """
+    Interpolate positions and velocities from a sampled trajectory.
+    
+    Positions are interpolated linearly between samples and velocities come
+    from the central finite-difference derivative of the samples.
+    
+    Args:
+        times: Sorted sample times in seconds, shape (n,)
+        positions: Sample positions in km, shape (n, 3)
+        query_times: Times to evaluate at, shape (m,)
+        
+    Returns:
+        tuple: (positions, velocities) with shape (m, 3)
+    """
+    if len(times) < 2:
+        raise ValueError("At least two trajectory points are needed to interpolate states")
+    
+    query_times = np.asarray(query_times, dtype=float)
+    velocities = np.gradient(positions, times, axis=0)
+    interpolated_positions = np.stack([np.interp(query_times, times, positions[:, k]) for k in range(3)], axis=-1)
+    interpolated_velocities = np.stack([np.interp(query_times, times, velocities[:, k]) for k in range(3)], axis=-1)
+    return interpolated_positions, interpolated_velocities
+
+def slice_trajectory(times: np.ndarray, positions: np.ndarray, start_seconds: float, end_seconds: float) -> dict:
+    """
+    Trajectory points between two times, keyed like stored trajectories.
+    
+    Args:
+        times: Sorted sample times in seconds, shape (n,)
+        positions: Sample positions in km, shape (n, 3)
+        start_seconds: Start of the window in seconds from reference date
+        end_seconds: End of the window in seconds from reference date
+        
+    Returns:
+        dict: Trajectory data between the specified times
+    """
+    first = np.searchsorted(times, start_seconds, side="left")
+    last = np.searchsorted(times, end_seconds, side="right")
+    return {f"{t}": position for t, position in zip(times[first:last].tolist(), positions[first:last].tolist())}
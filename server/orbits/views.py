@@ -1,32 +1,67 @@
+import numpy as np
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel, conlist
-from astropy import units as u
-from poliastro.bodies import Earth
-from poliastro.twobody import Orbit
+from typing import List
+
+from .twobody import state_to_elements
 
 app = FastAPI()
 
+# Earth's gravitational parameter, as used by poliastro.bodies.Earth.k
+EARTH_MU = 398600.4418  # km^3/s^2
+
 class OrbitInput(BaseModel):
     position: conlist(float, min_items=3, max_items=3)
     velocity: conlist(float, min_items=3, max_items=3)
 
+class OrbitBatchInput(BaseModel):
+    positions: List[conlist(float, min_items=3, max_items=3)]
+    velocities: List[conlist(float, min_items=3, max_items=3)]
+    mu: float = EARTH_MU
+
+def finite_or_none(value):
+    # Parabolic and degenerate states give inf/NaN elements, which JSON cannot carry.
+    value = float(value)
+    return value if np.isfinite(value) else None
+
+def elements_to_dicts(elements: dict) -> List[dict]:
+    return [
+        {
+            "semi_major_axis_km": finite_or_none(a),
+            "eccentricity": finite_or_none(ecc),
+            "inclination_deg": finite_or_none(inc),
+            "raan_deg": finite_or_none(raan),
+            "arg_periapsis_deg": finite_or_none(argp),
+            "true_anomaly_deg": finite_or_none(nu),
+        }
+        for a, ecc, inc, raan, argp, nu in zip(
+            elements["a"],
+            elements["ecc"],
+            np.degrees(elements["inc"]),
+            np.degrees(elements["raan"]),
+            np.degrees(elements["argp"]),
+            np.degrees(elements["nu"]),
+        )
+    ]
+
 @app.post("/compute_orbit/")
 async def compute_orbit(data: OrbitInput):
     try:
-        r = [data.position[0], data.position[1], data.position[2]] * u.km
-        v = [data.velocity[0], data.velocity[1], data.velocity[2]] * u.km / u.s
-        
-        orbit = Orbit.from_vectors(Earth, r, v)
-        
-        orbit_data = {
-            "semi_major_axis_km": orbit.a.to(u.km).value,
-            "eccentricity": orbit.ecc.value,
-            "inclination_deg": orbit.inc.to(u.deg).value,
-            "raan_deg": orbit.raan.to(u.deg).value if orbit.raan is not None else None,
-            "arg_periapsis_deg": orbit.argp.to(u.deg).value if orbit.argp is not None else None,
-            "true_anomaly_deg": orbit.nu.to(u.deg).value,
-        }
-        return orbit_data
-    
+        elements = state_to_elements([data.position], [data.velocity], EARTH_MU)
+        return elements_to_dicts(elements)[0]
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/compute_orbits/", summary="Classical orbital elements for many state vectors in one pass")
+async def compute_orbits(data: OrbitBatchInput):
+    if len(data.positions) != len(data.velocities):
+        raise HTTPException(status_code=400, detail="positions and velocities must have the same length")
+    if not data.positions:
+        return []
+    try:
+        elements = state_to_elements(data.positions, data.velocities, data.mu)
+        return elements_to_dicts(elements)
+
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -74,6 +74,7 @@ WSGI_APPLICATION = 'server.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+import json
 import os
 
 DATABASES = {
@@ -84,10 +85,25 @@ DATABASES = {
         "PASSWORD": os.getenv("DB_PASSWORD", "yourpassword"),
         "HOST": os.getenv("DB_HOST", "db"),
         "PORT": os.getenv("DB_PORT", "5432"),
+        # Keep connections open between requests instead of reconnecting on
+        # every query; the FastAPI app reuses them from its database pool
+        # (orbits.executors).
+        "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", "60")),
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
 
+# How BodyModel stores trajectories: "json" text, or "codec" for quantized,
+# delta-encoded, compressed blobs (orbits.codec). TRAJECTORY_PRECISION is the
+# codec's quantization step relative to each body's orbit scale.
+TRAJECTORY_STORAGE = os.getenv("TRAJECTORY_STORAGE", "json")
+TRAJECTORY_PRECISION = float(os.getenv("TRAJECTORY_PRECISION", "1e-10"))
+
+# Snapshot policy for bodies without their own (see orbits.snapshots), as
+# JSON, e.g. {"mode": "adaptive", "tolerance_km": 100}. Unset keeps the fixed
+# SNAPSHOT_INTERVAL cadence.
+SNAPSHOT_POLICY = json.loads(os.getenv("SNAPSHOT_POLICY", "null"))
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators